@@ -1 +1,6 @@
 from . import models
+
+
+def uninstall_hook(env):
+    """Drop the work queues, which are not tables of any model"""
+    env.cr.execute("DROP TABLE IF EXISTS target_tracking_report_dirty, target_tracking_dirty")
@@ -1,6 +1,6 @@
 {
     'name': 'Target Tracking',
-    'version': '18.0.1.0.0',
+    'version': '18.0.1.2.0',
     'category': 'Sales',
     'summary': 'Track customer targets by district',
     'description': '''
@@ -15,10 +15,13 @@
     'data': [
         'security/ir.model.access.csv',
         'data/ir_cron_data.xml',
+        'data/ir_actions_server_data.xml',
         'views/res_partner_views.xml',
         'views/target_tracking_views.xml',
+        'views/target_tracking_report_views.xml',
         'views/menu_views.xml',
     ],
+    'uninstall_hook': 'uninstall_hook',
     'installable': True,
     'application': False,
     'auto_install': False,
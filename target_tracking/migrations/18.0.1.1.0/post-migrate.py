@@ -0,0 +1,14 @@
+from odoo import api, SUPERUSER_ID
+
+
+def migrate(cr, version):
+    """Seed the achievement ledger with one confirmation entry per confirmed order.
+
+    The entries are posted like any confirmation, so cancelling an order
+    confirmed before the upgrade reverses exactly its own quantity.
+    """
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    orders = env['sale.order'].search([('state', 'in', ('sale', 'done'))])
+    Achievement = env['target.tracking.achievement']
+    Achievement._post_order_entries(orders)
+    Achievement._apply_ledger_totals()
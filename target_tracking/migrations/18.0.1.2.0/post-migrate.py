@@ -0,0 +1,7 @@
+from odoo import api, SUPERUSER_ID
+
+
+def migrate(cr, version):
+    """Rebuild the partner target rollup now that it is maintained from the ledger"""
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    env['res.partner']._refresh_target_rollup_sql(all_partners=True)
@@ -2,3 +2,5 @@ from . import res_partner
 from . import target_tracking
 from . import target_tracking_state
 from . import sale_order
+from . import target_tracking_achievement
+from . import target_tracking_report
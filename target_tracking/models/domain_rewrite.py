@@ -0,0 +1,106 @@
+"""Rewrite of target.tracking date filters into period overlap conditions.
+
+A filter on ``date_from`` coming from the search view selects target periods
+that overlap the chosen date range rather than periods starting in it. Only
+searches run with ``target_tracking_period_overlap`` in their context, as set
+by the target tracking actions, are rewritten:
+
+* ``('date_from', '>=', d)`` keeps periods ending on or after ``d``
+* ``('date_from', '<=', d)`` keeps periods starting on or before ``d``
+
+Both become ``period_overlap`` leaves served by the GiST index on the period
+daterange. Rewritten domains are memoized on their normalized form and the
+rewriter keeps counters and timings instead of logging every search. They are
+logged by the "Log Target Tracking Domain Rewrite Statistics" server action.
+"""
+import functools
+import logging
+import threading
+import time
+
+_logger = logging.getLogger(__name__)
+
+DOMAIN_OPERATORS = ('&', '|', '!')
+OVERLAP_OPERATORS = ('>=', '<=')
+
+# Searches run concurrently in the server threads
+_stats_lock = threading.Lock()
+_stats = {
+    'calls': 0,
+    'rewritten': 0,
+    'uncacheable': 0,
+    'time': 0.0,
+}
+
+
+def _freeze(value):
+    """Return a hashable copy of a domain (lists become tuples)"""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    hash(value)  # unhashable values (Query, SQL, ...) are not cached
+    return value
+
+
+def _rewrite_leaf(leaf):
+    if isinstance(leaf, (list, tuple)) and len(leaf) == 3:
+        field, operator, value = leaf
+        if field == 'date_from' and operator in OVERLAP_OPERATORS:
+            return ('period_overlap', operator, value), True
+    return leaf, False
+
+
+def _rewrite(domain):
+    """Rewrite the leaves of a prefix-notation domain wherever they sit under &, | and !
+
+    Return the new domain and whether any leaf was rewritten.
+    """
+    new_domain = []
+    changed = False
+    for item in domain:
+        if isinstance(item, str) and item in DOMAIN_OPERATORS:
+            new_domain.append(item)
+            continue
+        leaf, leaf_changed = _rewrite_leaf(item)
+        new_domain.append(leaf)
+        changed = changed or leaf_changed
+    return new_domain, changed
+
+
+@functools.lru_cache(maxsize=1024)
+def _rewrite_cached(frozen_domain):
+    new_domain, changed = _rewrite(frozen_domain)
+    return tuple(new_domain), changed
+
+
+def rewrite_domain(domain):
+    """Return ``domain`` with its date_from filters turned into overlap filters"""
+    if not domain:
+        return domain
+    start = time.perf_counter()
+    uncacheable = False
+    try:
+        new_domain, changed = _rewrite_cached(_freeze(domain))
+        new_domain = list(new_domain)
+    except TypeError:
+        uncacheable = True
+        new_domain, changed = _rewrite(domain)
+    elapsed = time.perf_counter() - start
+
+    with _stats_lock:
+        _stats['calls'] += 1
+        _stats['time'] += elapsed
+        _stats['uncacheable'] += uncacheable
+        _stats['rewritten'] += changed
+    if not changed:
+        return domain
+    if _logger.isEnabledFor(logging.DEBUG):
+        _logger.debug("Target Tracking domain %s rewritten to %s in %.6fs", domain, new_domain, elapsed)
+    return new_domain
+
+
+def rewrite_stats():
+    """Counters and cumulated timing of the domain rewrites in this process"""
+    info = _rewrite_cached.cache_info()
+    with _stats_lock:
+        stats = dict(_stats)
+    return dict(stats, cache_hits=info.hits, cache_misses=info.misses, cache_size=info.currsize)
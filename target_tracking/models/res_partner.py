@@ -35,16 +35,18 @@ class ResPartner(models.Model):
         default=0.0
     )
     
+    # Maintained in SQL from the latest target.tracking period, see _refresh_target_rollup
     target_achieved = fields.Float(
         string='Target Achieved',
-        compute='_compute_target_achieved',
-        store=True
+        readonly=True,
+        copy=False
     )
     
     pending_target = fields.Float(
         string='Pending Target',
         compute='_compute_pending_target',
-        store=True
+        store=True,
+        index=True
     )
     
     @api.model
@@ -61,14 +63,45 @@ class ResPartner(models.Model):
         last_day = next_month - relativedelta(days=1)
         return last_day.date()
     
-    @api.depends('target')
-    def _compute_target_achieved(self):
-        """Compute target achieved from target tracking records"""
-        for partner in self:
-            tracking_record = self.env['target.tracking'].search([
-                ('partner_id', '=', partner.id)
-            ], limit=1, order='date_from desc')
-            partner.target_achieved = tracking_record.target_achieved if tracking_record else 0.0
+    def _refresh_target_rollup(self):
+        """Refresh achieved and pending target of these partners from their latest period"""
+        partner_ids = [pid for pid in self._origin.ids if pid]
+        if not partner_ids:
+            return
+        self.env['target.tracking'].flush_model(['partner_id', 'date_from', 'target_achieved'])
+        self.flush_model(['target'])
+        self._refresh_target_rollup_sql(partner_ids=partner_ids)
+        self.browse(partner_ids).invalidate_recordset(['target_achieved', 'pending_target'])
+    
+    @api.model
+    def _refresh_target_rollup_sql(self, partner_ids=None, all_partners=False):
+        """Update the rollup columns with one statement for the given partners"""
+        self.env.cr.execute("""
+            WITH scope AS (
+                SELECT DISTINCT partner_id AS id
+                  FROM target_tracking
+                 WHERE %(all_partners)s
+                 UNION
+                SELECT unnest(%(partner_ids)s::int[])
+            ), rollup AS (
+                SELECT scope.id AS partner_id, COALESCE(latest.achieved, 0.0) AS achieved
+                  FROM scope
+             LEFT JOIN LATERAL (
+                    SELECT COALESCE(tt.target_achieved, 0.0) AS achieved
+                      FROM target_tracking tt
+                     WHERE tt.partner_id = scope.id
+                  ORDER BY tt.date_from DESC NULLS LAST, tt.id DESC
+                     LIMIT 1
+                ) latest ON TRUE
+            )
+            UPDATE res_partner partner
+               SET target_achieved = rollup.achieved,
+                   pending_target = COALESCE(partner.target, 0.0) - rollup.achieved
+              FROM rollup
+             WHERE partner.id = rollup.partner_id
+               AND (partner.target_achieved IS DISTINCT FROM rollup.achieved
+                    OR partner.pending_target IS DISTINCT FROM COALESCE(partner.target, 0.0) - rollup.achieved)
+        """, {'partner_ids': list(partner_ids or []), 'all_partners': all_partners})
     
     @api.depends('target', 'target_achieved')
     def _compute_pending_target(self):
@@ -82,59 +115,13 @@ class ResPartner(models.Model):
         
         # Auto-create target.tracking.state if state_id is set on a customer
         if 'state_id' in vals:
-            for partner in self:
-                if partner.customer_rank > 0 and partner.state_id:
-                    # Check if state already exists in target.tracking.state
-                    existing_state = self.env['target.tracking.state'].search([
-                        ('state_id', '=', partner.state_id.id)
-                    ], limit=1)
-                    
-                    # Create if doesn't exist
-                    if not existing_state:
-                        self.env['target.tracking.state'].create({
-                            'state_id': partner.state_id.id
-                        })
+            customers = self.filtered(lambda p: p.customer_rank > 0 and p.state_id)
+            self.env['target.tracking.state']._ensure_states(customers.state_id.ids)
         
         # Sync target fields to target.tracking
         target_fields = ['target_start_date', 'target_end_date', 'sales_representative_id', 'target', 'district']
-        if any(field in vals for field in target_fields):
-            for partner in self:
-                if partner.customer_rank > 0:  # Only for customers
-                    # Prepare values for sync
-                    sync_vals = {
-                        'partner_id': partner.id,
-                        'date_from': partner.target_start_date or fields.Date.today(),
-                        'date_to': partner.target_end_date or fields.Date.today(),
-                        'sales_representative_id': partner.sales_representative_id.id if partner.sales_representative_id else False,
-                        'jan_target': partner.target or 0.0,
-                        'district': partner.district or '',
-                        'taluka_name': partner.city or '',
-                        'phone': partner.phone or '',
-                        'state_id': partner.state_id.id if partner.state_id else False,
-                        'salesperson_id': partner.user_id.id if partner.user_id else False,
-                    }
-                    
-                    # Find target tracking record for the current date range
-                    tracking_record = self.env['target.tracking'].search([
-                        ('partner_id', '=', partner.id),
-                        ('date_from', '=', partner.target_start_date),
-                        ('date_to', '=', partner.target_end_date)
-                    ], limit=1)
-                    
-                    if tracking_record:
-                        # Update existing record for this date range
-                        tracking_record.write(sync_vals)
-                    else:
-                        # Create new tracking record for this date range
-                        self.env['target.tracking'].create(sync_vals)
-        
-        # Update related target tracking records if district, name, phone, or parent changes
-        if any(field in vals for field in ['name', 'phone', 'parent_id', 'city', 'state_id', 'user_id']):
-            for partner in self:
-                tracking_records = self.env['target.tracking'].search([('partner_id', '=', partner.id)])
-                # The related fields will auto-update, but we trigger a recompute
-                if tracking_records:
-                    tracking_records._compute_pending_target()
+        if any(field in vals for field in target_fields) and not self.env.context.get('skip_target_tracking_sync'):
+            self._sync_target_tracking()
         
         return result
 
@@ -146,27 +133,121 @@ class ResPartner(models.Model):
         
         return super(ResPartner, self).unlink()
     
+    def _prepare_target_tracking_vals(self):
+        """Values of the target.tracking row mirroring this partner's current target"""
+        self.ensure_one()
+        return {
+            'partner_id': self.id,
+            'date_from': self.target_start_date or fields.Date.today(),
+            'date_to': self.target_end_date or fields.Date.today(),
+            'sales_representative_id': self.sales_representative_id.id if self.sales_representative_id else False,
+            'jan_target': self.target or 0.0,
+            'district': self.district or '',
+            'taluka_name': self.city or '',
+            'phone': self.phone or '',
+            'state_id': self.state_id.id if self.state_id else False,
+            'salesperson_id': self.user_id.id if self.user_id else False,
+        }
+
+    def _sync_target_tracking(self):
+        """Mirror the customers' current target onto target.tracking in bulk.
+
+        Existing rows for every (partner, date_from, date_to) are fetched with
+        one search. Missing rows are created with one multi-create and the
+        others are written in groups sharing the same values, so the cost
+        follows the number of distinct values rather than partners.
+        """
+        customers = self.filtered(lambda p: p.customer_rank > 0)  # Only for customers
+        if not customers:
+            return
+        
+        vals_by_key = {}
+        for partner in customers:
+            sync_vals = partner._prepare_target_tracking_vals()
+            vals_by_key[(partner.id, sync_vals['date_from'], sync_vals['date_to'])] = sync_vals
+        
+        # Find target tracking records for the current date ranges in one query
+        TargetTracking = self.env['target.tracking'].with_context(target_tracking_period_overlap=False)
+        candidates = TargetTracking.search([
+            ('partner_id', 'in', customers.ids),
+            ('date_from', 'in', list({key[1] for key in vals_by_key})),
+            ('date_to', 'in', list({key[2] for key in vals_by_key})),
+        ], order='id')
+        existing_by_key = {}
+        for record in candidates:
+            existing_by_key.setdefault((record.partner_id.id, record.date_from, record.date_to), record)
+        
+        to_create = []
+        to_write = {}
+        for key, sync_vals in vals_by_key.items():
+            tracking_record = existing_by_key.get(key)
+            if not tracking_record:
+                # Create new tracking record for this date range
+                to_create.append(sync_vals)
+                continue
+            # Update existing record for this date range, grouped by identical values
+            write_vals = {
+                field: value for field, value in sync_vals.items()
+                if field not in ('partner_id', 'date_from', 'date_to')
+            }
+            group_key = tuple(sorted(write_vals.items()))
+            to_write.setdefault(group_key, TargetTracking)
+            to_write[group_key] |= tracking_record
+        
+        for group_key, records in to_write.items():
+            records.write(dict(group_key))
+        if to_create:
+            TargetTracking.create(to_create)
+
+    def _rollover_target_period(self, date_from, date_to):
+        """Move these customers to a new target period in one grouped write.
+
+        The next-period tracking rows are then synchronised in bulk, missing
+        ones being created with a single multi-create.
+        """
+        if not self:
+            return
+        self.with_context(skip_target_tracking_sync=True).write({
+            'target_start_date': date_from,
+            'target_end_date': date_to,
+            'target': 0.0,
+        })
+        self._sync_target_tracking()
+
     @api.model
-    def _cron_reset_target_monthly(self):
-        """Scheduled action to reset target dates and values at the end of each month"""
+    def _cron_reset_target_monthly(self, chunk_size=None):
+        """Scheduled action to reset target dates and values at the end of each month.
+
+        Customers are rolled over in committed chunks. The period and last
+        processed partner id are stored in ``target_tracking.rollover_progress``
+        so a crashed run picks up where it stopped.
+        """
         today = fields.Date.today()
+        params = self.env['ir.config_parameter'].sudo()
+        chunk_size = chunk_size or int(params.get_param('target_tracking.rollover_chunk_size', 1000))
+        
+        # Calculate next month's dates once for the whole run
+        next_month_start = today.replace(day=1)
+        next_month_end = (next_month_start + relativedelta(months=1)) - relativedelta(days=1)
         
-        # Get all customers with target data
-        customers = self.search([
-            ('customer_rank', '>', 0),
-            ('target_end_date', '!=', False)
-        ])
+        period_key = fields.Date.to_string(next_month_start)
+        last_id = 0
+        progress = params.get_param('target_tracking.rollover_progress', '')
+        if progress.startswith(period_key + ':'):
+            last_id = int(progress.split(':', 1)[1])
         
-        for customer in customers:
-            # Check if the target end date has passed
-            if customer.target_end_date and customer.target_end_date < today:
-                # Calculate next month's dates
-                next_month_start = today.replace(day=1)
-                next_month_end = (next_month_start + relativedelta(months=1)) - relativedelta(days=1)
-                
-                # Update to next month and reset target to 0
-                customer.write({
-                    'target_start_date': next_month_start,
-                    'target_end_date': next_month_end,
-                    'target': 0.0
-                })
+        while True:
+            # Customers whose target end date has passed, in id order so progress is monotonic
+            customers = self.search([
+                ('customer_rank', '>', 0),
+                ('target_end_date', '!=', False),
+                ('target_end_date', '<', today),
+                ('id', '>', last_id),
+            ], order='id', limit=chunk_size)
+            if not customers:
+                break
+            
+            customers._rollover_target_period(next_month_start, next_month_end)
+            last_id = customers[-1].id
+            params.set_param('target_tracking.rollover_progress', f'{period_key}:{last_id}')
+            self.env.cr.commit()
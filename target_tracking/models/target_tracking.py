@@ -1,8 +1,13 @@
 from odoo import models, fields, api
 from odoo.exceptions import ValidationError
+from odoo.tools import SQL
+from odoo.tools.sql import create_index
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
 import logging
+import psycopg2
+
+from . import domain_rewrite
 
 _logger = logging.getLogger(__name__)
 
@@ -87,10 +92,18 @@ class TargetTracking(models.Model):
         default=0.0
     )
     
+    achievement_ids = fields.One2many(
+        'target.tracking.achievement',
+        'tracking_id',
+        string='Achievement Ledger',
+        readonly=True
+    )
+    
+    # Maintained in SQL by the statements posting to the achievement ledger
     target_achieved = fields.Float(
         string='Target Achieved',
-        default=0.0,
-        readonly=True
+        readonly=True,
+        copy=False
     )
     
     pending_target = fields.Float(
@@ -99,6 +112,36 @@ class TargetTracking(models.Model):
         store=True
     )
     
+    period_overlap = fields.Date(
+        string='Period Overlap',
+        compute='_compute_period_overlap',
+        search='_search_period_overlap',
+        help='Technical field to filter periods overlapping an open date range'
+    )
+    
+    def init(self):
+        """Keep an indexed daterange of each period for containment and overlap lookups"""
+        self.env.cr.execute("""
+            ALTER TABLE target_tracking
+            ADD COLUMN IF NOT EXISTS period daterange
+            GENERATED ALWAYS AS (
+                CASE WHEN date_to < date_from THEN 'empty'::daterange
+                     ELSE daterange(date_from, date_to, '[]')
+                END
+            ) STORED
+        """)
+        # btree_gist lets the integer partner_id share the GiST index with the daterange,
+        # serving both the (partner_id, period @> date) ledger lookups and plain overlap filters
+        try:
+            with self.env.cr.savepoint():
+                self.env.cr.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+        except psycopg2.Error as e:
+            _logger.warning(f'btree_gist extension unavailable, indexing target periods alone: {str(e)}')
+            create_index(self.env.cr, 'target_tracking_period_gist_index', self._table, ['period'], method='gist')
+            return
+        create_index(self.env.cr, 'target_tracking_partner_period_gist_index', self._table, ['partner_id', 'period'], method='gist')
+        self.env.cr.execute("DROP INDEX IF EXISTS target_tracking_period_gist_index")
+    
     @api.model
     def _get_default_date_from(self):
         """Get the first day of the current month"""
@@ -128,48 +171,93 @@ class TargetTracking(models.Model):
         for record in self:
             record.pending_target = record.jan_target - record.target_achieved
     
+    def _compute_period_overlap(self):
+        for record in self:
+            record.period_overlap = False
+    
+    def _search_period_overlap(self, operator, value):
+        """Match periods overlapping [value, ...) for '>=' and (..., value] for '<='"""
+        if operator not in ('>=', '<='):
+            raise ValidationError(f'Operator {operator} is not supported for period overlap.')
+        lower, upper = (value, None) if operator == '>=' else (None, value)
+        query = self._search([])
+        query.add_where(SQL(
+            "%s && daterange(%s::date, %s::date, '[]')",
+            SQL.identifier(query.table, 'period'), lower, upper,
+        ))
+        return [('id', 'in', query)]
+    
+    @api.model
+    def get_periods_containing(self, date, partner_ids):
+        """Return the tracking periods of ``partner_ids`` whose range contains ``date``.
+
+        The lookup is served by the GiST index on (partner_id, period).
+        """
+        self.flush_model(['date_from', 'date_to'])
+        query = self._search([('partner_id', 'in', list(partner_ids))])
+        query.add_where(SQL("%s @> %s::date", SQL.identifier(query.table, 'period'), date))
+        return self.browse(query.get_result_ids())
+    
     @api.model_create_multi
     def create(self, vals_list):
         """Auto-create target.tracking.state when creating target tracking records"""
         records = super(TargetTracking, self).create(vals_list)
         
         # Auto-create state records for new target tracking records
-        for record in records:
-            if record.state_id:
-                # Check if state already exists
-                existing_state = self.env['target.tracking.state'].search([
-                    ('state_id', '=', record.state_id.id)
-                ], limit=1)
-                
-                # Create if doesn't exist
-                if not existing_state:
-                    self.env['target.tracking.state'].create({
-                        'state_id': record.state_id.id
-                    })
+        self.env['target.tracking.state']._ensure_states(records.state_id.ids)
+        
+        # A new period may become the latest one of its customer
+        records.partner_id._refresh_target_rollup()
+        self.env['target.tracking.report']._mark_dirty(records._get_report_keys())
         
         return records
     
     def write(self, vals):
         """Auto-create target.tracking.state when updating state_id"""
+        rollup_fields = ('partner_id', 'date_from', 'date_to')
+        partners = self.partner_id if any(field in vals for field in rollup_fields) else self.env['res.partner']
+        
+        report_fields = self.env['target.tracking.report']._KEY_FIELDS + ('partner_id', 'jan_target')
+        report_keys = self._get_report_keys() if any(field in vals for field in report_fields) else set()
+        
         result = super(TargetTracking, self).write(vals)
         
         # Auto-create state if state_id is being set/changed
         if 'state_id' in vals:
-            for record in self:
-                if record.state_id:
-                    # Check if state already exists
-                    existing_state = self.env['target.tracking.state'].search([
-                        ('state_id', '=', record.state_id.id)
-                    ], limit=1)
-                    
-                    # Create if doesn't exist
-                    if not existing_state:
-                        self.env['target.tracking.state'].create({
-                            'state_id': record.state_id.id
-                        })
+            self.env['target.tracking.state']._ensure_states(self.state_id.ids)
+        
+        # Moving a period can change which one is the latest for its customers
+        if partners:
+            (partners | self.partner_id)._refresh_target_rollup()
+        
+        # Queue the performance cube cells the records left and joined
+        if report_keys:
+            self.env['target.tracking.report']._mark_dirty(report_keys | self._get_report_keys())
         
         return result
     
+    def unlink(self):
+        """Refresh the target rollup and queue the performance cube cells losing a period"""
+        partners = self.partner_id
+        report_keys = self._get_report_keys()
+        result = super(TargetTracking, self).unlink()
+        partners.exists()._refresh_target_rollup()
+        self.env['target.tracking.report']._mark_dirty(report_keys)
+        return result
+    
+    def _get_report_keys(self):
+        """Return the target.tracking.report cells these records belong to"""
+        if not self.ids:
+            return set()
+        key_fields = self.env['target.tracking.report']._KEY_FIELDS
+        self.flush_recordset(list(key_fields))
+        self.env.cr.execute(f"""
+            SELECT DISTINCT {', '.join(key_fields)}
+              FROM target_tracking
+             WHERE id = ANY(%s)
+        """, [self.ids])
+        return set(self.env.cr.fetchall())
+    
     @api.constrains('date_from', 'date_to')
     def _check_date_range(self):
         """Ensure date_to is greater than or equal to date_from"""
@@ -179,29 +267,38 @@ class TargetTracking(models.Model):
     
     def recalculate_target_achieved(self):
         """Recalculate target achieved based on confirmed sale orders in date range"""
-        for record in self:
-            domain = [
-                ('partner_id', '=', record.partner_id.id),
-                ('state', 'in', ['sale', 'done'])
-            ]
-            
-            # Add date filters if date range is specified
-            if record.date_from:
-                domain.append(('date_order', '>=', record.date_from))
-            if record.date_to:
-                domain.append(('date_order', '<=', record.date_to))
-            
-            # Find all confirmed sale orders in the date range
-            sale_orders = self.env['sale.order'].search(domain)
-            
-            # Calculate total quantity from all order lines
-            total_qty = sum(
-                line.product_uom_qty 
-                for order in sale_orders 
-                for line in order.order_line
-            )
+        self.env['target.tracking.achievement']._post_recompute_adjustments(self.ids)
+    
+    @api.model
+    def _cron_recalculate_target_achieved(self, batch_size=None):
+        """Reconcile every tracking period in committed, resumable batches.
+
+        The last processed id is stored in ``target_tracking.recalculate_last_id``
+        so an interrupted run resumes after the last committed batch.
+        """
+        params = self.env['ir.config_parameter'].sudo()
+        batch_size = batch_size or int(params.get_param('target_tracking.recalculate_batch_size', 5000))
+        last_id = int(params.get_param('target_tracking.recalculate_last_id', 0))
+        
+        while True:
+            self.env.cr.execute("""
+                SELECT id FROM target_tracking
+                 WHERE id > %s
+              ORDER BY id
+                 LIMIT %s
+            """, (last_id, batch_size))
+            batch_ids = [row[0] for row in self.env.cr.fetchall()]
+            if not batch_ids:
+                break
             
-            record.target_achieved = total_qty
+            self.env['target.tracking.achievement']._post_recompute_adjustments(batch_ids)
+            last_id = batch_ids[-1]
+            params.set_param('target_tracking.recalculate_last_id', last_id)
+            self.env.cr.commit()
+            _logger.debug("Target achievement recalculated up to target.tracking id %s", last_id)
+        
+        # Full pass done, the next run starts from the beginning again
+        params.set_param('target_tracking.recalculate_last_id', 0)
     
     def action_open_form(self):
         """Open the form view for this record"""
@@ -224,60 +321,35 @@ class TargetTracking(models.Model):
             'res_model': 'target.tracking',
             'view_mode': 'list,form',
             'domain': [('state_id', '=', self.state_id.id)],
-            'context': {'group_by': 'district', 'default_state_id': self.state_id.id},
+            'context': {
+                'group_by': 'district',
+                'default_state_id': self.state_id.id,
+                'target_tracking_period_overlap': True,
+            },
             'target': 'current',
         }
     
     @api.model
-    def search(self, args, offset=0, limit=None, order=None, count=False):
-        """Override search to handle date range filtering with overlap logic"""
-        _logger.info(f"Target Tracking search - Original args: {args}")
-        new_args = []
-        i = 0
-        
-        while i < len(args):
-            arg = args[i]
-            
-            # Handle domain operators (&, |, !)
-            if isinstance(arg, str) and arg in ('&', '|', '!'):
-                new_args.append(arg)
-                i += 1
-                continue
-            
-            if isinstance(arg, (list, tuple)) and len(arg) == 3:
-                field, operator, value = arg
-                
-                # Intercept date_from filters and convert to overlap logic
-                if field == 'date_from' and operator in ('>=', '<=', '>', '<', '='):
-                    # Date range overlap logic:
-                    # Show records where target period overlaps with selected range
-                    if operator == '>=':
-                        # Selected start date - show records that end on or after this date
-                        # (target period ends during or after the selected start date)
-                        new_args.append('|')
-                        new_args.append(('date_to', '=', False))
-                        new_args.append(('date_to', '>=', value))
-                    elif operator == '<=':
-                        # Selected end date - show records that start on or before this date
-                        # (target period starts during or before the selected end date)
-                        new_args.append('|')
-                        new_args.append(('date_from', '=', False))
-                        new_args.append(('date_from', '<=', value))
-                    else:
-                        # For other operators, keep original behavior
-                        new_args.append(arg)
-                else:
-                    new_args.append(arg)
-            else:
-                new_args.append(arg)
-            
-            i += 1
-        
-        _logger.info(f"Target Tracking search - Transformed args: {new_args}")
-        
-        # Handle count parameter correctly
-        if count:
-            return super().search_count(new_args)
-        else:
-            return super().search(new_args, offset=offset, limit=limit, order=order)
-
+    def _search(self, domain, *args, **kwargs):
+        """Apply the date range overlap rewrite on every search entry point
+        (search, search_count, read_group, name_search, ...) of the target
+        tracking views, flagged by ``target_tracking_period_overlap`` in their
+        context. Other searches keep plain date_from comparisons."""
+        if self.env.context.get('target_tracking_period_overlap'):
+            domain = domain_rewrite.rewrite_domain(domain)
+        return super()._search(domain, *args, **kwargs)
+    
+    @api.model
+    def _log_domain_rewrite_stats(self):
+        """Log the date filter rewrite counters of this worker, see domain_rewrite"""
+        stats = domain_rewrite.rewrite_stats()
+        _logger.info("Target Tracking domain rewrite stats: %s", stats)
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': 'Domain Rewrite Statistics',
+                'message': ', '.join(f'{key}: {value}' for key, value in stats.items()),
+                'sticky': False,
+            },
+        }
@@ -0,0 +1,263 @@
+from odoo import models, fields, api
+
+
+class TargetTrackingAchievement(models.Model):
+    _name = 'target.tracking.achievement'
+    _description = 'Target Achievement Ledger'
+    _order = 'date desc, id desc'
+
+    tracking_id = fields.Many2one(
+        'target.tracking',
+        string='Target Tracking',
+        required=True,
+        ondelete='cascade',
+        index=True,
+        readonly=True
+    )
+
+    order_id = fields.Many2one(
+        'sale.order',
+        string='Sale Order',
+        ondelete='cascade',
+        index=True,
+        readonly=True
+    )
+
+    entry_type = fields.Selection(
+        [
+            ('sale', 'Order Confirmation'),
+            ('reversal', 'Order Reversal'),
+            ('adjustment', 'Recalculation'),
+        ],
+        string='Entry Type',
+        required=True,
+        readonly=True
+    )
+
+    quantity = fields.Float(
+        string='Quantity',
+        readonly=True
+    )
+
+    date = fields.Date(
+        string='Date',
+        readonly=True
+    )
+
+    def _flush_ledger_sources(self):
+        """Flush every field read by the ledger SQL statements"""
+        self.env['sale.order'].flush_model(['partner_id', 'date_order', 'state'])
+        self.env['sale.order.line'].flush_model(['order_id', 'product_uom_qty'])
+        self.env['target.tracking'].flush_model(['partner_id', 'date_from', 'date_to'])
+        self.flush_model()
+
+    def init(self):
+        # Periods whose stored totals lag behind the ledger, appended by the posting
+        # transactions without any constraint so that they never wait on each other
+        self.env.cr.execute("""
+            CREATE TABLE IF NOT EXISTS target_tracking_dirty (
+                tracking_id integer
+            )
+        """)
+
+    def _after_ledger_post(self, tracking_ids, queue_totals=True):
+        """Drop cached aggregates and queue the stored totals of the posted periods.
+
+        The ledger statements only insert: the totals stored on the periods and
+        the partner rollup fed by them are derived from the ledger by the
+        refresh cron.
+        """
+        self.invalidate_model()
+        self.env['target.tracking'].invalidate_model(['achievement_ids'])
+        if not tracking_ids:
+            return
+        trackings = self.env['target.tracking'].browse(tracking_ids)
+        if queue_totals:
+            self._queue_totals(tracking_ids)
+        self.env['target.tracking.report']._mark_dirty(trackings._get_report_keys())
+
+    @api.model
+    def _queue_totals(self, tracking_ids):
+        """Queue periods for _apply_queued_totals, with one insert right before commit"""
+        precommit = self.env.cr.precommit
+        queued_ids = precommit.data.get('target_tracking.dirty_tracking_ids')
+        if queued_ids is None:
+            queued_ids = precommit.data['target_tracking.dirty_tracking_ids'] = set()
+            precommit.add(self._flush_queued_totals)
+        queued_ids.update(tracking_ids)
+
+    def _flush_queued_totals(self):
+        tracking_ids = self.env.cr.precommit.data.pop('target_tracking.dirty_tracking_ids', set())
+        if not tracking_ids:
+            return
+        self.env.cr.execute("""
+            INSERT INTO target_tracking_dirty (tracking_id)
+            SELECT unnest(%s::int[])
+        """, [list(tracking_ids)])
+        self.env.ref('target_tracking.ir_cron_refresh_target_tracking_report').sudo()._trigger()
+
+    @api.model
+    def _apply_queued_totals(self):
+        """Derive the stored totals of the queued periods from the ledger"""
+        self.env.cr.execute("DELETE FROM target_tracking_dirty RETURNING tracking_id")
+        tracking_ids = list({row[0] for row in self.env.cr.fetchall()})
+        if tracking_ids:
+            self._apply_ledger_totals(tracking_ids)
+        return self.env['target.tracking'].browse(tracking_ids)
+
+    @api.model
+    def _apply_ledger_totals(self, tracking_ids=None):
+        """Set achieved and pending target of the periods from their ledger in one statement.
+
+        ``None`` refreshes every period. The rollup of the partners whose
+        totals changed is refreshed afterwards.
+        """
+        self.flush_model(['tracking_id', 'quantity'])
+        self.env['target.tracking'].flush_model(['jan_target', 'target_achieved', 'pending_target'])
+        self.env.cr.execute("""
+            UPDATE target_tracking tt
+               SET target_achieved = totals.quantity,
+                   pending_target = COALESCE(tt.jan_target, 0.0) - totals.quantity
+              FROM (
+                    SELECT scope.id, COALESCE(SUM(ledger.quantity), 0.0) AS quantity
+                      FROM target_tracking scope
+                 LEFT JOIN target_tracking_achievement ledger ON ledger.tracking_id = scope.id
+                     WHERE %(all_periods)s OR scope.id = ANY(%(tracking_ids)s)
+                  GROUP BY scope.id
+                   ) totals
+             WHERE tt.id = totals.id
+               AND (tt.target_achieved IS DISTINCT FROM totals.quantity
+                    OR tt.pending_target IS DISTINCT FROM COALESCE(tt.jan_target, 0.0) - totals.quantity)
+         RETURNING tt.partner_id
+        """, {'all_periods': tracking_ids is None, 'tracking_ids': list(tracking_ids or [])})
+        partner_ids = {row[0] for row in self.env.cr.fetchall()}
+        self.env['target.tracking'].invalidate_model(['target_achieved', 'pending_target'])
+        self.env['res.partner'].browse(partner_ids)._refresh_target_rollup()
+
+    @api.model
+    def _post_order_entries(self, orders):
+        """Post one confirmation entry per (order, tracking period) in a single insert.
+
+        The periods are looked up once per order date with
+        target.tracking.get_periods_containing. Only pairs without an open
+        confirmation are posted, so confirming the same order twice never
+        counts it twice.
+        """
+        orders = orders.filtered('date_order')
+        if not orders:
+            return
+        TargetTracking = self.env['target.tracking'].sudo().with_context(target_tracking_period_overlap=False)
+        pairs = []
+        for order_date, date_orders in orders.grouped(lambda order: order.date_order.date()).items():
+            periods = TargetTracking.get_periods_containing(order_date, date_orders.partner_id.ids)
+            periods_by_partner = periods.grouped('partner_id')
+            for order in date_orders:
+                pairs.extend((order.id, period.id) for period in periods_by_partner.get(order.partner_id, []))
+        if not pairs:
+            return
+        self._flush_ledger_sources()
+        order_ids, tracking_ids = zip(*pairs)
+        self.env.cr.execute("""
+            WITH pairs AS (
+                SELECT unnest(%(order_ids)s::int[]) AS order_id,
+                       unnest(%(tracking_ids)s::int[]) AS tracking_id
+            ), order_qty AS (
+                SELECT order_id, SUM(product_uom_qty) AS total
+                  FROM sale_order_line
+                 WHERE order_id = ANY(%(order_ids)s)
+              GROUP BY order_id
+            ), open_entries AS (
+                SELECT order_id, tracking_id
+                  FROM target_tracking_achievement
+                 WHERE order_id = ANY(%(order_ids)s)
+              GROUP BY order_id, tracking_id
+                HAVING COUNT(*) FILTER (WHERE entry_type = 'sale')
+                     > COUNT(*) FILTER (WHERE entry_type = 'reversal')
+            )
+            INSERT INTO target_tracking_achievement
+                (tracking_id, order_id, entry_type, quantity, date,
+                 create_uid, create_date, write_uid, write_date)
+            SELECT pairs.tracking_id, so.id, 'sale', COALESCE(oq.total, 0.0), so.date_order::date,
+                   %(uid)s, NOW() AT TIME ZONE 'UTC', %(uid)s, NOW() AT TIME ZONE 'UTC'
+              FROM pairs
+              JOIN sale_order so ON so.id = pairs.order_id
+         LEFT JOIN order_qty oq ON oq.order_id = so.id
+         LEFT JOIN open_entries oe ON oe.order_id = so.id AND oe.tracking_id = pairs.tracking_id
+             WHERE oe.order_id IS NULL
+         RETURNING tracking_id
+        """, {'order_ids': list(order_ids), 'tracking_ids': list(tracking_ids), 'uid': self.env.uid})
+        self._after_ledger_post({row[0] for row in self.env.cr.fetchall()})
+
+    @api.model
+    def _reverse_order_entries(self, orders):
+        """Post a negative entry for every open confirmation of the given orders"""
+        if not orders:
+            return
+        self._flush_ledger_sources()
+        self.env.cr.execute("""
+            INSERT INTO target_tracking_achievement
+                (tracking_id, order_id, entry_type, quantity, date,
+                 create_uid, create_date, write_uid, write_date)
+            SELECT tracking_id, order_id, 'reversal', -SUM(quantity), %(today)s,
+                   %(uid)s, NOW() AT TIME ZONE 'UTC', %(uid)s, NOW() AT TIME ZONE 'UTC'
+              FROM target_tracking_achievement
+             WHERE order_id = ANY(%(order_ids)s)
+               AND entry_type IN ('sale', 'reversal')
+          GROUP BY tracking_id, order_id
+            HAVING COUNT(*) FILTER (WHERE entry_type = 'sale')
+                 > COUNT(*) FILTER (WHERE entry_type = 'reversal')
+         RETURNING tracking_id
+        """, {'order_ids': orders.ids, 'uid': self.env.uid, 'today': fields.Date.today()})
+        self._after_ledger_post({row[0] for row in self.env.cr.fetchall()})
+
+    @api.model
+    def _post_recompute_adjustments(self, tracking_ids=None):
+        """Reconcile the ledger with confirmed sale orders using one grouped join.
+
+        ``tracking_ids`` restricts the reconciliation to those periods; ``None``
+        reconciles every period. Each period whose ledger total differs from
+        the quantity actually ordered gets a single adjustment entry.
+        """
+        if tracking_ids is not None and not tracking_ids:
+            return
+        self._flush_ledger_sources()
+        self.env.cr.execute("""
+            WITH scope AS (
+                SELECT id, partner_id, period
+                  FROM target_tracking
+                 WHERE %(all_periods)s OR id = ANY(%(tracking_ids)s)
+            ), actual AS (
+                SELECT scope.id AS tracking_id, COALESCE(SUM(sol.product_uom_qty), 0.0) AS quantity
+                  FROM scope
+             LEFT JOIN sale_order so
+                    ON so.partner_id = scope.partner_id
+                   AND so.state IN ('sale', 'done')
+                   AND so.date_order IS NOT NULL
+                   AND scope.period @> so.date_order::date
+             LEFT JOIN sale_order_line sol ON sol.order_id = so.id
+              GROUP BY scope.id
+            ), posted AS (
+                SELECT ledger.tracking_id, SUM(ledger.quantity) AS quantity
+                  FROM target_tracking_achievement ledger
+                  JOIN scope ON scope.id = ledger.tracking_id
+              GROUP BY ledger.tracking_id
+            )
+            INSERT INTO target_tracking_achievement
+                (tracking_id, entry_type, quantity, date,
+                 create_uid, create_date, write_uid, write_date)
+            SELECT actual.tracking_id, 'adjustment', actual.quantity - COALESCE(posted.quantity, 0.0), %(today)s,
+                   %(uid)s, NOW() AT TIME ZONE 'UTC', %(uid)s, NOW() AT TIME ZONE 'UTC'
+              FROM actual
+         LEFT JOIN posted ON posted.tracking_id = actual.tracking_id
+             WHERE ABS(actual.quantity - COALESCE(posted.quantity, 0.0)) > 0.000001
+         RETURNING tracking_id
+        """, {
+            'all_periods': tracking_ids is None,
+            'tracking_ids': list(tracking_ids or []),
+            'uid': self.env.uid,
+            'today': fields.Date.today(),
+        })
+        posted_ids = {row[0] for row in self.env.cr.fetchall()}
+        # Reconciliation is run on demand, so its totals are applied right away
+        self._apply_ledger_totals(tracking_ids)
+        self._after_ledger_post(posted_ids, queue_totals=False)
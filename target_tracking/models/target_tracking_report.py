@@ -0,0 +1,204 @@
+from odoo import models, fields, api
+from odoo.tools.sql import index_exists
+
+
+class TargetTrackingReport(models.Model):
+    _name = 'target.tracking.report'
+    _description = 'Target Performance Analysis'
+    _auto = False
+    _rec_name = 'district'
+    _order = 'date_from desc, state_id, district, taluka_name'
+
+    # Dimensions of a cube cell, in the order used by the refresh statements
+    _KEY_FIELDS = (
+        'date_from', 'date_to', 'state_id', 'district',
+        'taluka_name', 'salesperson_id', 'sales_representative_id',
+    )
+
+    date_from = fields.Date(string='Start Date', readonly=True)
+    date_to = fields.Date(string='End Date', readonly=True)
+    state_id = fields.Many2one('res.country.state', string='State', readonly=True)
+    district = fields.Char(string='District', readonly=True)
+    taluka_name = fields.Char(string='Talukas Names', readonly=True)
+    salesperson_id = fields.Many2one('res.users', string='Salesperson', readonly=True)
+    sales_representative_id = fields.Many2one('hr.employee', string='Sales Representative', readonly=True)
+    customer_count = fields.Integer(string='# Customers', readonly=True)
+    target = fields.Float(string='Target', readonly=True)
+    target_achieved = fields.Float(string='Target Achieved', readonly=True)
+    pending_target = fields.Float(string='Pending Target', readonly=True)
+
+    def init(self):
+        """Create the cube and dirty-key tables, and build the cube when it is empty.
+
+        A module update keeps the existing cells: they are maintained through
+        the dirty-key queue and only a new or empty cube is built in full.
+        """
+        self.env.cr.execute("""
+            CREATE TABLE IF NOT EXISTS target_tracking_report (
+                id serial PRIMARY KEY,
+                date_from date,
+                date_to date,
+                state_id integer,
+                district varchar,
+                taluka_name varchar,
+                salesperson_id integer,
+                sales_representative_id integer,
+                customer_count integer,
+                target double precision,
+                target_achieved double precision,
+                pending_target double precision
+            )
+        """)
+        # Cells to rebuild, appended by the transactions changing periods or the ledger.
+        # No constraint on purpose: concurrent writers never wait on each other here.
+        self.env.cr.execute("""
+            CREATE TABLE IF NOT EXISTS target_tracking_report_dirty (
+                date_from date,
+                date_to date,
+                state_id integer,
+                district varchar,
+                taluka_name varchar,
+                salesperson_id integer,
+                sales_representative_id integer
+            )
+        """)
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS target_tracking_report_key_index
+                ON target_tracking_report (date_from, state_id, district)
+        """)
+        if not index_exists(self.env.cr, 'target_tracking_report_key_unique'):
+            # Cells built before the unique cell index existed are rebuilt from scratch
+            self.env.cr.execute("TRUNCATE target_tracking_report")
+        self.env.cr.execute(f"""
+            CREATE UNIQUE INDEX IF NOT EXISTS target_tracking_report_key_unique
+                ON target_tracking_report ({self._conflict_columns()})
+        """)
+        self.env.cr.execute("SELECT 1 FROM target_tracking_report LIMIT 1")
+        if self.env.cr.fetchone():
+            return
+        self.env.cr.execute(f"""
+            INSERT INTO target_tracking_report ({self._insert_columns()})
+            {self._select_cells()}
+          GROUP BY {self._group_by_columns()}
+        """)
+
+    @api.model
+    def _insert_columns(self):
+        return ', '.join(self._KEY_FIELDS + ('customer_count', 'target', 'target_achieved', 'pending_target'))
+
+    @api.model
+    def _key_expressions(self, alias):
+        """Key columns of ``alias`` with empty texts read as NULL, so '' and NULL share a cell"""
+        return [
+            f"NULLIF({alias}.{field}, '')" if field in ('district', 'taluka_name') else f'{alias}.{field}'
+            for field in self._KEY_FIELDS
+        ]
+
+    @api.model
+    def _group_by_columns(self):
+        return ', '.join(self._key_expressions('tt'))
+
+    @api.model
+    def _conflict_columns(self):
+        """Expressions of the unique cell index, NULL keys being mapped to a sentinel"""
+        defaults = {'date_from': "'-infinity'::date", 'date_to': "'-infinity'::date", 'district': "''", 'taluka_name': "''"}
+        return ', '.join(f'(COALESCE({field}, {defaults.get(field, 0)}))' for field in self._KEY_FIELDS)
+
+    @api.model
+    def _select_cells(self, join_keys='', where='TRUE'):
+        """Aggregate target.tracking rows and their achieved totals into cube cells"""
+        return f"""
+            SELECT {self._group_by_columns()},
+                   COUNT(DISTINCT tt.partner_id),
+                   SUM(COALESCE(tt.jan_target, 0.0)),
+                   SUM(COALESCE(tt.target_achieved, 0.0)),
+                   SUM(COALESCE(tt.jan_target, 0.0) - COALESCE(tt.target_achieved, 0.0))
+              FROM target_tracking tt
+              {join_keys}
+             WHERE {where}
+        """
+
+    @api.model
+    def _mark_dirty(self, keys):
+        """Queue the cube cells identified by ``keys`` for the next refresh.
+
+        ``keys`` is an iterable of tuples following ``_KEY_FIELDS``, as returned
+        by ``target.tracking._get_report_keys``. The keys of a transaction are
+        collected and appended to the dirty table once, right before commit.
+        """
+        keys = set(keys)
+        if not keys:
+            return
+        precommit = self.env.cr.precommit
+        dirty_keys = precommit.data.get('target_tracking.report_dirty_keys')
+        if dirty_keys is None:
+            dirty_keys = precommit.data['target_tracking.report_dirty_keys'] = set()
+            precommit.add(self._flush_dirty_keys)
+        dirty_keys.update(keys)
+
+    def _flush_dirty_keys(self):
+        keys = self.env.cr.precommit.data.pop('target_tracking.report_dirty_keys', set())
+        if not keys:
+            return
+        self.env.cr.execute(f"""
+            INSERT INTO target_tracking_report_dirty ({', '.join(self._KEY_FIELDS)})
+            SELECT * FROM unnest(%s::date[], %s::date[], %s::int[], %s::varchar[], %s::varchar[], %s::int[], %s::int[])
+        """, [list(column) for column in zip(*keys)])
+
+    @api.model
+    def _cron_refresh_dirty_cells(self):
+        """Apply the queued period totals, then rebuild the cube cells queued by _mark_dirty"""
+        self.env['target.tracking.achievement']._apply_queued_totals()
+        self.env.cr.execute(f"DELETE FROM target_tracking_report_dirty RETURNING {', '.join(self._KEY_FIELDS)}")
+        self._refresh_cells(self.env.cr.fetchall())
+
+    @api.model
+    def _refresh_cells(self, keys):
+        """Recompute only the cube cells identified by ``keys``.
+
+        Cells still backed by tracking rows are upserted on the unique cell index,
+        the others are deleted.
+        """
+        keys = list(set(keys))
+        if not keys:
+            return
+        self.env['target.tracking'].flush_model(list(self._KEY_FIELDS) + ['partner_id', 'jan_target', 'target_achieved'])
+
+        key_match = ' AND '.join(
+            f'{expression} IS NOT DISTINCT FROM k.{field}'
+            for expression, field in zip(self._key_expressions('{alias}'), self._KEY_FIELDS)
+        )
+        key_columns = ', '.join(
+            f'{expression} AS {field}'
+            for expression, field in zip(self._key_expressions('raw'), self._KEY_FIELDS)
+        )
+        select_cells = self._select_cells(
+            join_keys='JOIN k ON ' + key_match.format(alias='tt'),
+            # Narrow the scan with the date_from index before matching the keys
+            where='(tt.date_from = ANY(%s) OR (%s AND tt.date_from IS NULL))',
+        )
+        self.env.cr.execute(f"""
+            WITH k AS (
+                SELECT DISTINCT {key_columns}
+                  FROM unnest(%s::date[], %s::date[], %s::int[], %s::varchar[], %s::varchar[], %s::int[], %s::int[])
+                    AS raw({', '.join(self._KEY_FIELDS)})
+            ), upserted AS (
+                INSERT INTO target_tracking_report ({self._insert_columns()})
+                {select_cells}
+              GROUP BY {self._group_by_columns()}
+                ON CONFLICT ({self._conflict_columns()}) DO UPDATE
+                   SET customer_count = EXCLUDED.customer_count,
+                       target = EXCLUDED.target,
+                       target_achieved = EXCLUDED.target_achieved,
+                       pending_target = EXCLUDED.pending_target
+             RETURNING id
+            )
+            DELETE FROM target_tracking_report report
+             USING k
+             WHERE {key_match.format(alias='report')}
+               AND report.id NOT IN (SELECT id FROM upserted)
+        """, [list(column) for column in zip(*keys)] + [
+            [key[0] for key in keys if key[0]],
+            any(not key[0] for key in keys),
+        ])
+        self.invalidate_model()
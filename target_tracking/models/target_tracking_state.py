@@ -1,4 +1,4 @@
-from odoo import models, fields, api
+from odoo import models, fields, api, tools
 
 
 class TargetTrackingState(models.Model):
@@ -17,6 +17,47 @@ class TargetTrackingState(models.Model):
         ('state_unique', 'UNIQUE(state_id)', 'This state already exists in target tracking!')
     ]
     
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Invalidate the registered state cache"""
+        records = super(TargetTrackingState, self).create(vals_list)
+        self.env.registry.clear_cache()
+        return records
+    
+    def write(self, vals):
+        """Invalidate the registered state cache when the state changes"""
+        result = super(TargetTrackingState, self).write(vals)
+        if 'state_id' in vals:
+            self.env.registry.clear_cache()
+        return result
+    
+    def unlink(self):
+        """Invalidate the registered state cache"""
+        result = super(TargetTrackingState, self).unlink()
+        self.env.registry.clear_cache()
+        return result
+    
+    @tools.ormcache()
+    def _get_registered_state_ids(self):
+        """Return the ids of the res.country.state already registered for target tracking"""
+        self.flush_model(['state_id'])
+        self.env.cr.execute("SELECT state_id FROM target_tracking_state")
+        return frozenset(row[0] for row in self.env.cr.fetchall())
+    
+    @api.model
+    def _ensure_states(self, state_ids):
+        """Register the given states, inserting only the unknown ones in a single statement"""
+        missing_ids = set(state_ids) - self._get_registered_state_ids()
+        if not missing_ids:
+            return
+        self.env.cr.execute("""
+            INSERT INTO target_tracking_state (state_id, create_uid, create_date, write_uid, write_date)
+            SELECT missing.state_id, %(uid)s, NOW() AT TIME ZONE 'UTC', %(uid)s, NOW() AT TIME ZONE 'UTC'
+              FROM unnest(%(state_ids)s::int[]) AS missing(state_id)
+            ON CONFLICT (state_id) DO NOTHING
+        """, {'state_ids': sorted(missing_ids), 'uid': self.env.uid})
+        self.env.registry.clear_cache()
+    
     def action_open_target_tracking(self):
         """Open target tracking list view filtered by this state and grouped by district"""
         self.ensure_one()
@@ -28,7 +69,8 @@ class TargetTrackingState(models.Model):
             'domain': [('state_id', '=', self.state_id.id)],
             'context': {
                 'group_by': 'district',
-                'default_state_id': self.state_id.id
+                'default_state_id': self.state_id.id,
+                'target_tracking_period_overlap': True,
             },
             'target': 'current',
         }
@@ -0,0 +1,135 @@
+import json
+import logging
+import time
+from contextlib import contextmanager
+
+from dateutil.relativedelta import relativedelta
+
+from odoo import Command, fields
+from odoo.tests import TransactionCase, tagged
+
+_logger = logging.getLogger(__name__)
+
+
+@tagged('benchmark', '-standard')
+class TestTargetTrackingBenchmark(TransactionCase):
+    """Time the target tracking hot paths on synthetic data.
+
+    Not part of the standard suite, run it on a staging database with::
+
+        odoo-bin -d <db> -u target_tracking --test-tags /target_tracking:benchmark --stop-after-init
+
+    The report is logged as JSON.
+    """
+
+    SIZES = (1000, 10000, 100000)
+    PERIODS = 3
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.state = cls.env['res.country.state'].search([], limit=1)
+        cls.product = cls.env['product.product'].create({
+            'name': 'Benchmark Product',
+            'type': 'consu',
+            'list_price': 10.0,
+        })
+
+    def setUp(self):
+        super().setUp()
+        # The monthly reset commits its chunks
+        self.patch(self.env.cr, 'commit', lambda: None)
+
+    @contextmanager
+    def _measure(self, results, operation, size, records):
+        """Record wall time and SQL query count of the enclosed block"""
+        self.env.flush_all()
+        queries_before = self.env.cr.sql_log_count
+        start = time.perf_counter()
+        yield
+        self.env.flush_all()
+        results.append({
+            'operation': operation,
+            'size': size,
+            'records': records,
+            'wall_time': round(time.perf_counter() - start, 4),
+            'queries': self.env.cr.sql_log_count - queries_before,
+        })
+
+    def _generate_data(self, size):
+        """Create customers with monthly tracking periods and one draft order each"""
+        month_start = fields.Date.today().replace(day=1)
+        customers = self.env['res.partner'].create([{
+            'name': f'Benchmark Customer {index}',
+            'customer_rank': 1,
+            'city': f'Taluka {index % 50}',
+            'district': f'District {index % 10}',
+            'state_id': self.state.id,
+            'target_start_date': month_start,
+            'target_end_date': month_start + relativedelta(months=1, days=-1),
+            'target': 100.0,
+        } for index in range(size)])
+
+        trackings = self.env['target.tracking'].create([{
+            'partner_id': customer.id,
+            'date_from': month_start - relativedelta(months=offset),
+            'date_to': month_start - relativedelta(months=offset) + relativedelta(months=1, days=-1),
+            'jan_target': 100.0,
+            'district': customer.district,
+            'taluka_name': customer.city,
+            'state_id': self.state.id,
+        } for customer in customers for offset in range(self.PERIODS)])
+
+        orders = self.env['sale.order'].create([{
+            'partner_id': customer.id,
+            'date_order': fields.Datetime.now(),
+            'order_line': [Command.create({'product_id': self.product.id, 'product_uom_qty': 5.0})],
+        } for customer in customers])
+
+        self.env.flush_all()
+        return customers, trackings, orders
+
+    def _run_size(self, size):
+        results = []
+        customers, trackings, orders = self._generate_data(size)
+
+        with self._measure(results, 'sale_order.action_confirm', size, len(orders)):
+            orders.action_confirm()
+
+        # Queue the period totals and cube cells as the commit would, then drain them
+        self.env.cr.precommit.run()
+        with self._measure(results, 'target_tracking_report._cron_refresh_dirty_cells', size, len(trackings)):
+            self.env['target.tracking.report']._cron_refresh_dirty_cells()
+
+        with self._measure(results, 'res_partner.write_sync', size, len(customers)):
+            customers.write({'target': 250.0})
+
+        with self._measure(results, 'target_tracking.recalculate_target_achieved', size, len(trackings)):
+            trackings.recalculate_target_achieved()
+
+        # Make every target period expire so the monthly reset has work to do
+        customers.with_context(skip_target_tracking_sync=True).write({
+            'target_end_date': fields.Date.today() - relativedelta(days=1),
+        })
+        with self._measure(results, 'res_partner._cron_reset_target_monthly', size, len(customers)):
+            self.env['res.partner']._cron_reset_target_monthly()
+
+        return results
+
+    def test_benchmark(self):
+        report = {
+            'database': self.env.cr.dbname,
+            'date': fields.Datetime.to_string(fields.Datetime.now()),
+            'periods': self.PERIODS,
+            'results': [],
+        }
+        for size in self.SIZES:
+            savepoint = self.env.cr.savepoint(flush=False)
+            try:
+                report['results'] += self._run_size(size)
+            finally:
+                savepoint.close(rollback=True)
+                self.env.invalidate_all()
+
+        _logger.info("Target tracking benchmark report:\n%s", json.dumps(report, indent=2))
+        self.assertEqual(len(report['results']), 5 * len(self.SIZES))
@@ -1,6 +1,6 @@
 {
     'name': 'VSR Changes',
-    'version': '18.0.1.0.0',
+    'version': '18.0.1.2.0',
     'category': 'Stock',
     'summary': 'Customizations for VSR stock operations',
     'description': '''
@@ -11,9 +11,13 @@
         - Handles wastage deduction from downstream transfers
     ''',
     'author': 'Processdrive',
-    'depends': ['stock', 'sale', 'account', 'mrp', 'purchase_stock', 'l10n_in_edi_ewaybill', 'maintenance', 'quality_control', 'quality'],
+    'depends': ['stock', 'sale', 'sale_stock', 'account', 'mrp', 'purchase_stock', 'l10n_in_edi_ewaybill', 'maintenance', 'quality_control', 'quality'],
     'data': [
         'security/ir.model.access.csv',
+        'data/ir_cron_data.xml',
+        'data/ir_actions_server_data.xml',
+        'views/notification_queue_views.xml',
+        'views/query_plan_views.xml',
         'views/res_partner_views.xml',
         'views/product_template_views.xml',
         'views/purchase_order_views.xml',
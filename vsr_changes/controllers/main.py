@@ -0,0 +1,78 @@
+import csv
+import io
+import tempfile
+
+import xlsxwriter
+from werkzeug.wsgi import wrap_file
+
+from odoo import http
+from odoo.http import request, content_disposition
+
+from odoo.addons.vsr_changes.models.stock_statement_report import EXPORT_COLUMNS
+
+# Files below this size stay in memory, larger ones spill to disk
+SPOOL_MAX_SIZE = 10 * 1024 * 1024
+# Quantity columns start after category, code, product, period and location
+NUMBER_COLUMNS_START = 5
+
+
+class StockStatementExport(http.Controller):
+
+    @http.route('/vsr_changes/stock_statement/<int:wizard_id>/<string:export_format>', type='http', auth='user')
+    def export_stock_statement(self, wizard_id, export_format, **kwargs):
+        """Stream the stock statement rows into an XLSX or CSV file"""
+        wizard = request.env['vsr.stock.statement.wizard'].browse(wizard_id).exists()
+        if not wizard or export_format not in ('xlsx', 'csv'):
+            raise request.not_found()
+
+        report = request.env['report.vsr_changes.report_stock_statement']
+        lines = report._iter_statement_lines(wizard._get_report_data())
+        spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        if export_format == 'xlsx':
+            self._write_xlsx(spool, lines)
+            content_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        else:
+            self._write_csv(spool, lines)
+            content_type = 'text/csv; charset=utf-8'
+        spool.seek(0)
+
+        filename = 'Stock Statement %s - %s.%s' % (
+            wizard.date_start.date(), wizard.date_end.date(), export_format,
+        )
+        return request.make_response(
+            wrap_file(request.httprequest.environ, spool),
+            headers=[
+                ('Content-Type', content_type),
+                ('Content-Disposition', content_disposition(filename)),
+            ],
+        )
+
+    def _write_csv(self, stream, lines):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow([label for _key, label in EXPORT_COLUMNS])
+        for line in lines:
+            writer.writerow([line[key] for key, _label in EXPORT_COLUMNS])
+            # Move each row to the spooled file so the text buffer stays small
+            stream.write(buffer.getvalue().encode('utf-8'))
+            buffer.seek(0)
+            buffer.truncate()
+        stream.write(buffer.getvalue().encode('utf-8'))
+
+    def _write_xlsx(self, stream, lines):
+        # constant_memory flushes every row to disk as soon as the next one starts
+        workbook = xlsxwriter.Workbook(stream, {'constant_memory': True})
+        worksheet = workbook.add_worksheet('Stock Statement')
+        header_format = workbook.add_format({'bold': True})
+        number_format = workbook.add_format({'num_format': '#,##0.00'})
+        for col, (_key, label) in enumerate(EXPORT_COLUMNS):
+            worksheet.write(0, col, label, header_format)
+        worksheet.set_column(0, 0, 25)
+        worksheet.set_column(2, 2, 40)
+        for row, line in enumerate(lines, start=1):
+            for col, (key, _label) in enumerate(EXPORT_COLUMNS):
+                if col >= NUMBER_COLUMNS_START:
+                    worksheet.write_number(row, col, float(line[key] or 0.0), number_format)
+                else:
+                    worksheet.write(row, col, line[key] or '')
+        workbook.close()
@@ -0,0 +1,7 @@
+from odoo import api, SUPERUSER_ID
+
+
+def migrate(cr, version):
+    """Fill the invoice to delivery links the dispatch number is now computed from"""
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    env['account.move']._backfill_delivery_links(commit=False)
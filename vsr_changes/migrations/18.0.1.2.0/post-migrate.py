@@ -0,0 +1,7 @@
+from odoo import api, SUPERUSER_ID
+
+
+def migrate(cr, version):
+    """Record the scrapped quantities as already applied, they were deducted by the previous versions"""
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    env['stock.picking.wastage']._seed_from_scraps()
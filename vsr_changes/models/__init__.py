@@ -3,6 +3,7 @@ from . import sales_order
 from . import mrp_bom
 from . import stock_picking
 from . import stock_move
+from . import stock_snapshot
 from . import stock_statement_report
 from . import res_partner
 from . import account_move
@@ -10,3 +11,5 @@ from . import product_template
 from . import maintenance
 from . import cold_storage
 from . import sanitization_checklist
+from . import notification_queue
+from . import query_plan
@@ -1,4 +1,8 @@
 from odoo import models, fields, api
+import logging
+
+_logger = logging.getLogger(__name__)
+
 
 class AccountMove(models.Model):
     _inherit = 'account.move'
@@ -16,6 +20,17 @@ class AccountMove(models.Model):
         compute='_compute_delivery_number', 
         store=True
     )
+
+    delivery_picking_ids = fields.Many2many(
+        'stock.picking',
+        'account_move_delivery_picking_rel',
+        'move_id',
+        'picking_id',
+        string='Deliveries',
+        copy=False,
+        readonly=True,
+        help='Done outgoing transfers of the sale orders invoiced by this posted entry'
+    )
     
     destination = fields.Char(string='Destination')
 
@@ -28,17 +43,129 @@ class AccountMove(models.Model):
             elif not move.vsr_vehicle_number:
                 move.vsr_vehicle_number = False
 
-    @api.depends('invoice_line_ids.sale_line_ids.order_id.picking_ids', 'invoice_line_ids.sale_line_ids.order_id.picking_ids.state')
+    @api.depends('delivery_picking_ids')
     def _compute_delivery_number(self):
         for move in self:
-            # Use picking_type_id.code which is more reliable than picking_type_code related field
-            delivery_ids = move.invoice_line_ids.sale_line_ids.order_id.picking_ids.filtered(
-                lambda p: p.state == 'done' and p.picking_type_id.code == 'outgoing'
-            )
-            if delivery_ids:
-                move.delivery_number = ", ".join(delivery_ids.mapped('name'))
-            else:
-                move.delivery_number = ""
+            move.delivery_number = ", ".join(move.delivery_picking_ids.sorted('id').mapped('name'))
+
+    def _post(self, soft=True):
+        posted = super()._post(soft=soft)
+        if posted:
+            self._link_delivery_pickings(move_ids=posted.ids)
+        return posted
+
+    def button_draft(self):
+        res = super().button_draft()
+        self._unlink_delivery_pickings(move_ids=self.ids)
+        return res
+
+    def button_cancel(self):
+        res = super().button_cancel()
+        self._unlink_delivery_pickings(move_ids=self.ids)
+        return res
+
+    def _flush_delivery_link_sources(self):
+        self.env['account.move'].flush_model(['state'])
+        self.env['account.move.line'].flush_model(['move_id', 'sale_line_ids'])
+        self.env['sale.order.line'].flush_model(['order_id'])
+        self.env['stock.picking'].flush_model(['state', 'sale_id', 'picking_type_id'])
+
+    @api.model
+    def _link_delivery_pickings(self, move_ids=(), picking_ids=()):
+        """Link posted invoices to the done outgoing pickings of the sale orders they invoice.
+
+        Pairs are matched from the given invoices and from the given pickings in
+        two branches, each driven by the index of its entry point; the dispatch
+        number of the invoices that got new links is recomputed.
+        """
+        if not move_ids and not picking_ids:
+            return self.browse()
+        self._flush_delivery_link_sources()
+
+        self.env.cr.execute("""
+            INSERT INTO account_move_delivery_picking_rel (move_id, picking_id)
+            SELECT pairs.move_id, pairs.picking_id
+              FROM (
+                    SELECT aml.move_id, sp.id AS picking_id
+                      FROM account_move_line aml
+                      JOIN sale_order_line_invoice_rel rel ON rel.invoice_line_id = aml.id
+                      JOIN sale_order_line sol ON sol.id = rel.order_line_id
+                      JOIN stock_picking sp ON sp.sale_id = sol.order_id
+                     WHERE aml.move_id = ANY(%(move_ids)s)
+                     UNION
+                    SELECT aml.move_id, sp.id AS picking_id
+                      FROM stock_picking sp
+                      JOIN sale_order_line sol ON sol.order_id = sp.sale_id
+                      JOIN sale_order_line_invoice_rel rel ON rel.order_line_id = sol.id
+                      JOIN account_move_line aml ON aml.id = rel.invoice_line_id
+                     WHERE sp.id = ANY(%(picking_ids)s)
+                   ) pairs
+              JOIN account_move am ON am.id = pairs.move_id
+              JOIN stock_picking sp ON sp.id = pairs.picking_id
+              JOIN stock_picking_type spt ON spt.id = sp.picking_type_id
+             WHERE am.state = 'posted'
+               AND sp.state = 'done'
+               AND spt.code = 'outgoing'
+            ON CONFLICT DO NOTHING
+            RETURNING move_id
+        """, {'move_ids': list(move_ids), 'picking_ids': list(picking_ids)})
+        moves = self.browse({row[0] for row in self.env.cr.fetchall()})
+        moves._refresh_delivery_number()
+        return moves
+
+    @api.model
+    def _unlink_delivery_pickings(self, move_ids=()):
+        """Drop the links of the given invoices that are no longer posted"""
+        if not move_ids:
+            return self.browse()
+        self._flush_delivery_link_sources()
+        self.env.cr.execute("""
+            DELETE FROM account_move_delivery_picking_rel link
+             USING account_move am
+             WHERE am.id = link.move_id
+               AND link.move_id = ANY(%s)
+               AND am.state != 'posted'
+         RETURNING link.move_id
+        """, [list(move_ids)])
+        moves = self.browse({row[0] for row in self.env.cr.fetchall()})
+        moves._refresh_delivery_number()
+        return moves
+
+    def _refresh_delivery_number(self):
+        if self:
+            self.invalidate_recordset(['delivery_picking_ids'])
+            self.env.add_to_compute(self._fields['delivery_number'], self)
+
+    @api.model
+    def _backfill_delivery_links(self, batch_size=None, commit=True):
+        """Link every existing customer invoice to its deliveries, one batch of invoices at a time"""
+        batch_size = batch_size or int(
+            self.env['ir.config_parameter'].sudo().get_param('vsr_changes.delivery_link_batch_size', 1000)
+        )
+        last_id = 0
+        while True:
+            self.env.cr.execute("""
+                SELECT id
+                  FROM account_move
+                 WHERE id > %s
+                   AND move_type IN ('out_invoice', 'out_refund')
+              ORDER BY id
+                 LIMIT %s
+            """, [last_id, batch_size])
+            move_ids = [row[0] for row in self.env.cr.fetchall()]
+            if not move_ids:
+                break
+            self._link_delivery_pickings(move_ids=move_ids)
+            # Drop links left by invoices since cancelled or reset to draft
+            self._unlink_delivery_pickings(move_ids=move_ids)
+            # Also refresh invoices without any link, whose number was computed the old way
+            self.env.add_to_compute(self._fields['delivery_number'], self.browse(move_ids))
+            self.env.flush_all()
+            if commit:
+                self.env.cr.commit()
+            self.env.invalidate_all()
+            last_id = move_ids[-1]
+            _logger.info("Invoice delivery links backfilled up to invoice %s", last_id)
 
 
 class AccountMoveLine(models.Model):
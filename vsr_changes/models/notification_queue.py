@@ -0,0 +1,121 @@
+from odoo import models, fields, api
+from datetime import timedelta
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+class NotificationQueue(models.Model):
+    _name = 'vsr.notification.queue'
+    _description = 'Deferred Chatter Notification'
+    _order = 'id'
+    _rec_name = 'res_model'
+
+    res_model = fields.Char(string='Model', required=True, index=True)
+    res_id = fields.Many2oneReference(string='Record', model_field='res_model', required=True)
+    author_id = fields.Many2one('res.partner', string='Author', ondelete='set null')
+    body = fields.Html(string='Message', sanitize=False)
+    state = fields.Selection([
+        ('pending', 'Pending'),
+        ('done', 'Posted'),
+        ('failed', 'Failed'),
+    ], string='Status', default='pending', required=True, index=True)
+    attempt_count = fields.Integer(string='Attempts', default=0)
+    next_attempt_at = fields.Datetime(string='Next Attempt', help='Failed attempts are retried after an exponential backoff')
+    last_error = fields.Text(string='Last Error')
+    posted_date = fields.Datetime(string='Posted On')
+
+    @api.model
+    def _enqueue(self, res_model, bodies):
+        """Queue chatter notes ``{record_id: body}`` on ``res_model``.
+
+        The notes are posted by the queue worker once the current transaction
+        is committed, so business hooks do not pay for the chatter writes.
+        """
+        if not bodies:
+            return self.browse()
+        jobs = self.sudo().create([{
+            'res_model': res_model,
+            'res_id': res_id,
+            'author_id': self.env.user.partner_id.id,
+            'body': body,
+        } for res_id, body in bodies.items()])
+        # The trigger row only becomes visible to the cron workers after commit
+        self.env.ref('vsr_changes.ir_cron_process_notification_queue').sudo()._trigger()
+        return jobs
+
+    @api.model
+    def _cron_process_queue(self, batch_size=None):
+        """Post the pending notifications in batches, committing after each batch"""
+        params = self.env['ir.config_parameter'].sudo()
+        batch_size = batch_size or int(params.get_param('vsr_changes.notification_batch_size', 500))
+        max_attempts = int(params.get_param('vsr_changes.notification_max_attempts', 5))
+
+        while True:
+            # Jobs waiting for their backoff are left alone, so a failure is not retried in the same run
+            jobs = self.search([
+                ('state', '=', 'pending'),
+                '|', ('next_attempt_at', '=', False), ('next_attempt_at', '<=', fields.Datetime.now()),
+            ], limit=batch_size)
+            if not jobs:
+                break
+            groups = {}
+            for job in jobs:
+                groups.setdefault((job.res_model, job.author_id.id), self.browse())
+                groups[(job.res_model, job.author_id.id)] |= job
+            for (res_model, author_id), group_jobs in groups.items():
+                group_jobs._post_batch(res_model, author_id, max_attempts)
+            self.env.cr.commit()
+
+        # Wake up again when the first deferred job is due
+        deferred = self.search([('state', '=', 'pending'), ('next_attempt_at', '!=', False)], order='next_attempt_at', limit=1)
+        if deferred:
+            self.env.ref('vsr_changes.ir_cron_process_notification_queue').sudo()._trigger(at=deferred.next_attempt_at)
+
+    def _post_batch(self, res_model, author_id, max_attempts):
+        """Log these jobs of a single model and author with as few batch calls as possible"""
+        try:
+            with self.env.cr.savepoint():
+                records = self.env[res_model].browse(self.mapped('res_id')).exists()
+                missing = self.filtered(lambda job: job.res_id not in records.ids)
+                remaining = self - missing
+                # A record can only receive one body per batch call
+                while remaining:
+                    seen = set()
+                    current = self.browse()
+                    for job in remaining:
+                        if job.res_id not in seen:
+                            seen.add(job.res_id)
+                            current |= job
+                    records.browse(list(seen))._message_log_batch(
+                        bodies={job.res_id: job.body for job in current},
+                        author_id=author_id,
+                    )
+                    remaining -= current
+            (self - missing).write({'state': 'done', 'posted_date': fields.Datetime.now(), 'last_error': False, 'next_attempt_at': False})
+            missing.write({'state': 'failed', 'last_error': 'The record no longer exists.'})
+        except Exception as e:
+            _logger.warning(f'Error posting queued notifications on {res_model}: {str(e)}')
+            for job in self:
+                attempt_count = job.attempt_count + 1
+                job.write({
+                    'attempt_count': attempt_count,
+                    'last_error': str(e),
+                    'state': 'failed' if attempt_count >= max_attempts else 'pending',
+                    # 2, 4, 8, 16... minutes before the next try
+                    'next_attempt_at': fields.Datetime.now() + timedelta(minutes=2 ** attempt_count),
+                })
+
+    def action_retry(self):
+        """Put failed notifications back in the queue"""
+        self.write({'state': 'pending', 'attempt_count': 0, 'last_error': False, 'next_attempt_at': False})
+        self.env.ref('vsr_changes.ir_cron_process_notification_queue').sudo()._trigger()
+
+    @api.autovacuum
+    def _gc_done_notifications(self):
+        """Delete the posted notifications older than ``vsr_changes.notification_retention_days``"""
+        retention_days = int(self.env['ir.config_parameter'].sudo().get_param('vsr_changes.notification_retention_days', 30))
+        self.search([
+            ('state', '=', 'done'),
+            ('posted_date', '<', fields.Datetime.now() - timedelta(days=retention_days)),
+        ], limit=models.GC_UNLINK_LIMIT).unlink()
@@ -1,4 +1,50 @@
 from odoo import models, fields, api
+import logging
+import re
+
+_logger = logging.getLogger(__name__)
+
+# Standard pack sizes: (pattern, label, weight in kg, pieces per case).
+# The look-behind keeps e.g. "2.5 KG" or "15 KG" from matching the "5 KG" pack.
+PACK_SIZES = [
+    # KG patterns
+    (re.compile(r'(?<![\d.])5\s*KG'), '5 KG', 5.0, 4),
+    (re.compile(r'(?<![\d.])2\.5\s*KG'), '2.5 KG', 2.5, 6),
+    (re.compile(r'(?<![\d.])1\s*KG'), '1 KG', 1.0, 12),
+    # Gram patterns
+    (re.compile(r'(?<![\d.])500\s*G'), '500 G', 0.5, 24),
+    (re.compile(r'(?<![\d.])300\s*G'), '300 G', 0.3, 40),
+    (re.compile(r'(?<![\d.])200\s*G'), '200 G', 0.2, 60),
+    (re.compile(r'(?<![\d.])100\s*G'), '100 G', 0.1, 90),
+    (re.compile(r'(?<![\d.])60\s*G'), '60 G', 0.06, 160),
+    (re.compile(r'(?<![\d.])30\s*G'), '30 G', 0.03, 40),
+    (re.compile(r'(?<![\d.])7\s*G'), '7 G', 0.007, 1500),
+]
+# Any other weight, sold by the piece
+KG_PATTERN = re.compile(r'(?<![\d.])(\d+(?:\.\d+)?)\s*KG')
+G_PATTERN = re.compile(r'(?<![\d.])(\d+(?:\.\d+)?)\s*G')
+
+
+def parse_pack_size(name):
+    """Read the pack size from a product name.
+
+    Returns ``(label, weight_kg, pieces_per_case)``, e.g. ``('500 G', 0.5, 24)``,
+    or ``('', 0.0, 0)`` when the name has no weight.
+    """
+    if not name:
+        return '', 0.0, 0
+    name_upper = name.upper()
+    for pattern, label, weight_kg, pieces in PACK_SIZES:
+        if pattern.search(name_upper):
+            return label, weight_kg, pieces
+    kg_match = KG_PATTERN.search(name_upper)
+    if kg_match:
+        return f"{kg_match.group(1)} KG", float(kg_match.group(1)), 1
+    g_match = G_PATTERN.search(name_upper)
+    if g_match:
+        return f"{g_match.group(1)} G", float(g_match.group(1)) / 1000.0, 1
+    return '', 0.0, 0
+
 
 class ProductTemplate(models.Model):
     _inherit = 'product.template'
@@ -14,3 +60,45 @@ class ProductTemplate(models.Model):
         digits='Product Price',
         help="Manual price per piece"
     )
+
+    pack_size_label = fields.Char(
+        string='Pack Size',
+        compute='_compute_pack_size',
+        store=True,
+        help="Pack size read from the product name, e.g. 500 G"
+    )
+
+    pack_weight_kg = fields.Float(
+        string='Pack Weight (kg)',
+        digits=(16, 4),
+        compute='_compute_pack_size',
+        store=True,
+        help="Weight of one pack in kg, read from the product name"
+    )
+
+    pack_pieces_per_case = fields.Integer(
+        string='Packs per Case',
+        compute='_compute_pack_size',
+        store=True,
+        help="Number of packs in a case for the standard pack sizes"
+    )
+
+    @api.depends('name')
+    def _compute_pack_size(self):
+        for template in self:
+            template.pack_size_label, template.pack_weight_kg, template.pack_pieces_per_case = parse_pack_size(
+                template.with_context(lang='en_US').name
+            )
+
+    @api.model
+    def _backfill_pack_sizes(self, batch_size=1000):
+        """Recompute the pack sizes of the whole catalogue, one batch of templates per commit"""
+        templates = self.with_context(active_test=False).search([], order='id')
+        pack_fields = [self._fields[name] for name in ('pack_size_label', 'pack_weight_kg', 'pack_pieces_per_case')]
+        for start in range(0, len(templates), batch_size):
+            batch = templates[start:start + batch_size]
+            for field in pack_fields:
+                self.env.add_to_compute(field, batch)
+            batch.flush_recordset(['pack_size_label', 'pack_weight_kg', 'pack_pieces_per_case'])
+            self.env.cr.commit()
+            _logger.info("Pack sizes recomputed for %s/%s product templates", start + len(batch), len(templates))
@@ -1,5 +1,8 @@
-from odoo import models, fields, api
+from collections import defaultdict
+
+from odoo import models, fields, api, Command
 from odoo.exceptions import UserError
+from odoo.tools import float_is_zero
 
 
 class StockPickingVSR(models.Model):
@@ -9,27 +12,15 @@ class StockPickingVSR(models.Model):
     supplier_id = fields.Many2one('res.partner', string='Supplier', help='Supplier information')
     wastage = fields.Float(string='Wastage', digits=(10, 2), help='Wastage percentage or amount')
     weight_slip = fields.Image(string='Weight Slip', max_width=1024, max_height=1024, help='Weight slip image')
+    vendor_bill_id = fields.Many2one('account.move', string='Vendor Bill', copy=False, readonly=True, ondelete='set null', index='btree_not_null', help='Vendor bill this receipt was billed on')
+    vendor_bill_state = fields.Selection(related='vendor_bill_id.state', string='Vendor Bill Status')
 
     def get_tax_details(self):
         """Compute tax breakdown for the receipt"""
-        tax_data = {}
-        for move in self.move_ids:
-            if move.vsr_tax_ids and move.subtotal:
-                taxes = move.vsr_tax_ids.compute_all(
-                    move.rate,
-                    currency=move.currency_id,
-                    quantity=move.product_uom_qty,
-                    product=move.product_id,
-                    partner=move.picking_id.partner_id
-                )
-                for tax_line in taxes['taxes']:
-                    tax_name = tax_line['name']
-                    amount = tax_line['amount']
-                    if tax_name in tax_data:
-                        tax_data[tax_name] += amount
-                    else:
-                        tax_data[tax_name] = amount
-        return tax_data
+        tax_data = defaultdict(float)
+        for tax_line in self.vsr_tax_summary_ids:
+            tax_data[tax_line.tax_id.name] += tax_line.amount
+        return dict(tax_data)
 
     def button_wastage(self):
         """Open wastage wizard for the picking"""
@@ -57,95 +48,171 @@ class StockPickingVSR(models.Model):
     def button_create_bill(self):
         """Create a vendor bill from the receipt"""
         self.ensure_one()
+        return self.action_create_bills()
+
+    def action_create_bills(self):
+        """Create vendor bills for the selected receipts, one per vendor, currency and company"""
+        receipts = self.filtered(
+            # A receipt whose bill was cancelled can be billed again
+            lambda p: p.picking_type_code == 'incoming' and (not p.vendor_bill_id or p.vendor_bill_state == 'cancel')
+        )
         
         # Get the partner from partner_id or supplier_id
-        partner = self.partner_id or self.supplier_id
-        if not partner:
-            raise UserError('Please set a vendor in the receipt before creating a bill.')
+        without_vendor = receipts.filtered(lambda p: not (p.partner_id or p.supplier_id))
+        if without_vendor:
+            raise UserError('Please set a vendor in the receipt before creating a bill: %s' % ', '.join(without_vendor.mapped('name')))
         
-        # Prepare invoice lines from stock moves
-        invoice_lines = []
-        for move in self.move_ids:
-            if move.state == 'done' and move.product_id:
-                # Get price and taxes from the move
-                price_unit = move.rate if move.rate else 0.0
-                tax_ids = move.vsr_tax_ids.ids if move.vsr_tax_ids else []
-                
-                invoice_lines.append((0, 0, {
-                    'product_id': move.product_id.id,
-                    'name': move.product_id.display_name,
-                    'quantity': move.product_uom_qty,
-                    'product_uom_id': move.product_uom.id,
-                    'price_unit': price_unit,
-                    'tax_ids': [(6, 0, tax_ids)],
-                }))
-        
-        # Create the vendor bill
-        bill_vals = {
-            'move_type': 'in_invoice',
-            'partner_id': partner.id,
-            'invoice_date': fields.Date.context_today(self),
-            'invoice_origin': self.name,
-            'invoice_line_ids': invoice_lines,
-        }
+        # Read rates, taxes and quantities of all billable moves at once
+        moves = receipts.move_ids.filtered(lambda m: m.state == 'done' and m.product_id)
+        moves.fetch(['picking_id', 'product_id', 'product_uom_qty', 'product_uom', 'rate', 'vsr_tax_ids', 'purchase_line_id'])
         
-        bill = self.env['account.move'].create(bill_vals)
+        # Rates are in the currency of the purchase order, the company's one without order
+        groups = defaultdict(list)
+        for move in moves:
+            picking = move.picking_id
+            partner = picking.partner_id or picking.supplier_id
+            currency = move.purchase_line_id.order_id.currency_id or picking.company_id.currency_id
+            groups[(partner.id, currency.id, picking.company_id.id)].append(move)
+        if not groups:
+            raise UserError('There is nothing to bill in the selected receipts.')
         
-        # Return action to open the created bill
-        return {
-            'name': 'Vendor Bill',
+        bill_vals_list = []
+        pickings_list = []
+        for (partner_id, currency_id, company_id), group_moves in groups.items():
+            pickings = self.env['stock.picking'].union(*(move.picking_id for move in group_moves))
+            invoice_lines = [Command.create({
+                'product_id': move.product_id.id,
+                'name': move.product_id.display_name,
+                'quantity': move.product_uom_qty,
+                'product_uom_id': move.product_uom.id,
+                'price_unit': move.rate or 0.0,
+                'tax_ids': [Command.set(move.vsr_tax_ids.ids)],
+            }) for move in group_moves]
+            bill_vals_list.append({
+                'move_type': 'in_invoice',
+                'partner_id': partner_id,
+                'currency_id': currency_id,
+                'company_id': company_id,
+                'invoice_date': fields.Date.context_today(self),
+                'invoice_origin': ', '.join(pickings.mapped('name')),
+                'invoice_line_ids': invoice_lines,
+            })
+            pickings_list.append(pickings)
+        
+        bills = self.env['account.move'].create(bill_vals_list)
+        billed = self.env['stock.picking']
+        for pickings, bill in zip(pickings_list, bills):
+            pickings.write({'vendor_bill_id': bill.id})
+            billed |= pickings
+        
+        # Return action to open the created bill(s)
+        action = {
+            'name': 'Vendor Bills',
             'type': 'ir.actions.act_window',
             'res_model': 'account.move',
-            'res_id': bill.id,
-            'view_mode': 'form',
-            'view_id': self.env.ref('account.view_move_form').id,
             'target': 'current',
         }
+        if len(bills) == 1:
+            action.update({
+                'name': 'Vendor Bill',
+                'res_id': bills.id,
+                'view_mode': 'form',
+                'views': [(self.env.ref('account.view_move_form').id, 'form')],
+            })
+        else:
+            action.update({
+                'view_mode': 'list,form',
+                'views': [(False, 'list'), (self.env.ref('account.view_move_form').id, 'form')],
+                'domain': [('id', 'in', bills.ids)],
+            })
+        skipped = self - billed
+        if len(bills) == 1 and not skipped:
+            return action
+        message = '%s receipt(s) billed on %s vendor bill(s): %s.' % (len(billed), len(bills), ', '.join(billed.mapped('name')))
+        if skipped:
+            message += ' Not billed (already billed, not a receipt or nothing done): %s.' % ', '.join(skipped.mapped('name'))
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': 'Vendor Bills',
+                'message': message,
+                'type': 'warning' if skipped else 'success',
+                'sticky': bool(skipped),
+                'next': action,
+            },
+        }
 
     def _update_wastage_from_scrap(self):
-        """Update wastage field and deduct from next transfer's demand based on scrap records"""
-        for picking in self:
-            # Search for all scrap records linked to this picking
-            scrap_records = self.env['stock.scrap'].search([
-                ('picking_id', '=', picking.id)
-            ])
-            
-            if scrap_records:
-                # Group wastage by product
-                wastage_by_product = {}
-                for scrap in scrap_records:
-                    product_id = scrap.product_id.id
-                    if product_id not in wastage_by_product:
-                        wastage_by_product[product_id] = 0
-                    wastage_by_product[product_id] += scrap.scrap_qty
-                
-                # Sum up all manually entered scrap quantities
-                total_scrap_qty = sum(scrap.scrap_qty for scrap in scrap_records)
-                
-                # Update the wastage field in this picking
-                picking.wastage = total_scrap_qty
-                
-                # Update next transfer's demand by deducting wastage
-                destination_moves = picking.move_ids.mapped('move_dest_ids')
+        """Update wastage field and deduct from next transfer's demand based on scrap records.
+
+        The quantity actually deducted from each next move is kept in the wastage
+        ledger, so only the change since the last update reaches the next transfers
+        and a smaller scrap never gives back more than was really deducted.
+        """
+        pickings = self.filtered('id')
+        if not pickings:
+            return
+        
+        # Current scrap quantities per picking and product, in one query
+        wastage_by_key = {}
+        total_by_picking = defaultdict(float)
+        for picking, product, scrap_qty in self.env['stock.scrap']._read_group(
+            [('picking_id', 'in', pickings.ids)], ['picking_id', 'product_id'], ['scrap_qty:sum'],
+        ):
+            wastage_by_key[(picking.id, product.id)] = scrap_qty
+            total_by_picking[picking.id] += scrap_qty
+        
+        ledger = self.env['stock.picking.wastage'].search([('picking_id', 'in', pickings.ids)])
+        ledger_by_key = {(line.picking_id.id, line.move_id.id): line for line in ledger}
+        
+        for picking in pickings:
+            # Update the wastage field in this picking
+            if picking.wastage != total_by_picking[picking.id]:
+                picking.wastage = total_by_picking[picking.id]
+        
+        product_ids_by_picking = defaultdict(set)
+        for picking_id, product_id in wastage_by_key:
+            product_ids_by_picking[picking_id].add(product_id)
+        for line in ledger:
+            product_ids_by_picking[line.picking_id.id].add(line.product_id.id)
+        
+        precision = self.env['decimal.precision'].precision_get('Product Unit of Measure')
+        new_qty_by_move = {}
+        ledger_vals = []
+        for picking in pickings:
+            product_ids = product_ids_by_picking[picking.id]
+            if not product_ids:
+                continue
+            next_moves = picking.move_ids.move_dest_ids.picking_id.move_ids.filtered(
+                lambda m: m.state not in ('done', 'cancel') and m.product_id.id in product_ids
+            )
+            for move in next_moves:
+                line = ledger_by_key.get((picking.id, move.id))
+                applied_qty = line.applied_qty if line else 0.0
+                current_qty = new_qty_by_move.get(move, move.product_uom_qty)
+                # Deduct only the change, never below a zero demand; a negative change
+                # gives back at most what this move actually lost
+                delta = min(wastage_by_key.get((picking.id, move.product_id.id), 0.0) - applied_qty, current_qty)
+                if float_is_zero(delta, precision_digits=precision):
+                    continue
+                new_qty_by_move[move] = current_qty - delta
                 
-                if destination_moves:
-                    # Get the pickings that contain these destination moves
-                    next_pickings = destination_moves.mapped('picking_id')
-                    
-                    for next_picking in next_pickings:
-                        # Deduct wastage from demand in the next transfer
-                        for move in next_picking.move_ids:
-                            if move.product_id.id in wastage_by_product:
-                                wastage_qty = wastage_by_product[move.product_id.id]
-                                
-                                # Reduce demand (product_uom_qty) by wastage amount
-                                if move.product_uom_qty >= wastage_qty:
-                                    move.product_uom_qty -= wastage_qty
-                                else:
-                                    move.product_uom_qty = 0
-                                
-                                # Also update quantity to match demand
-                                move.quantity = move.product_uom_qty
+                if line:
+                    line.applied_qty = applied_qty + delta
+                else:
+                    ledger_vals.append({
+                        'picking_id': picking.id,
+                        'move_id': move.id,
+                        'product_id': move.product_id.id,
+                        'applied_qty': delta,
+                    })
+        
+        if ledger_vals:
+            self.env['stock.picking.wastage'].create(ledger_vals)
+        for move, qty in new_qty_by_move.items():
+            # Also update quantity to match demand
+            move.write({'product_uom_qty': qty, 'quantity': qty})
 
 
 class StockScrapVSR(models.Model):
@@ -157,9 +224,7 @@ class StockScrapVSR(models.Model):
         scraps = super().create(vals_list)
         
         # Update wastage in associated pickings only when new scrap is created
-        pickings_to_update = scraps.mapped('picking_id').filtered(lambda p: p)
-        for picking in pickings_to_update:
-            picking._update_wastage_from_scrap()
+        scraps.picking_id._update_wastage_from_scrap()
         
         return scraps
 
@@ -173,9 +238,7 @@ class StockScrapVSR(models.Model):
         # Update wastage in associated pickings if scrap_qty changed
         if 'scrap_qty' in vals or 'quantity' in vals or 'picking_id' in vals:
             pickings_after = self.mapped('picking_id').filtered(lambda p: p)
-            all_pickings = (pickings_before | pickings_after)
-            for picking in all_pickings:
-                picking._update_wastage_from_scrap()
+            (pickings_before | pickings_after)._update_wastage_from_scrap()
         
         return result
 
@@ -185,7 +248,44 @@ class StockScrapVSR(models.Model):
         result = super().unlink()
         
         # Update wastage in associated pickings after deletion
-        for picking in picking_ids:
-            picking._update_wastage_from_scrap()
+        picking_ids._update_wastage_from_scrap()
         
         return result
+
+
+class StockPickingWastage(models.Model):
+    _name = 'stock.picking.wastage'
+    _description = 'Applied Receipt Wastage'
+
+    picking_id = fields.Many2one('stock.picking', string='Transfer', required=True, index=True, ondelete='cascade')
+    move_id = fields.Many2one('stock.move', string='Deducted From', required=True, index=True, ondelete='cascade', help='Move of the next transfer whose demand was reduced')
+    product_id = fields.Many2one('product.product', string='Product', required=True, ondelete='cascade')
+    applied_qty = fields.Float(string='Applied Wastage', digits='Product Unit of Measure', help='Wastage actually deducted from the demand of the move')
+
+    _sql_constraints = [
+        ('picking_move_uniq', 'unique(picking_id, move_id)', 'The wastage of a transfer is recorded once per next move.'),
+    ]
+
+    @api.model
+    def _seed_from_scraps(self):
+        """Record the scrapped quantities as deducted from the open next moves, as
+        the versions before the ledger did, so they are not deducted twice"""
+        self.env.cr.execute("""
+            INSERT INTO stock_picking_wastage
+                (picking_id, move_id, product_id, applied_qty, create_uid, create_date, write_uid, write_date)
+            SELECT DISTINCT scrap.picking_id, next_move.id, scrap.product_id, scrap.qty,
+                   %(uid)s, NOW() AT TIME ZONE 'UTC', %(uid)s, NOW() AT TIME ZONE 'UTC'
+              FROM (
+                    SELECT picking_id, product_id, SUM(scrap_qty) AS qty
+                      FROM stock_scrap
+                     WHERE picking_id IS NOT NULL
+                  GROUP BY picking_id, product_id
+                   ) scrap
+              JOIN stock_move src ON src.picking_id = scrap.picking_id
+              JOIN stock_move_move_rel rel ON rel.move_orig_id = src.id
+              JOIN stock_move dest ON dest.id = rel.move_dest_id
+              JOIN stock_move next_move ON next_move.picking_id = dest.picking_id
+                                       AND next_move.product_id = scrap.product_id
+             WHERE next_move.state NOT IN ('done', 'cancel')
+            ON CONFLICT (picking_id, move_id) DO NOTHING
+        """, {'uid': self.env.uid})
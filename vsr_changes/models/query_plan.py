@@ -0,0 +1,98 @@
+from odoo import models, fields, api
+from odoo.tools import SQL
+from dateutil.relativedelta import relativedelta
+import json
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+class QueryPlan(models.Model):
+    _name = 'vsr.query.plan'
+    _description = 'Report Query Plan'
+    _order = 'capture_date desc, id desc'
+
+    name = fields.Char(string='Query', required=True, readonly=True)
+    capture_date = fields.Datetime(string='Captured On', required=True, readonly=True, default=fields.Datetime.now)
+    execution_time = fields.Float(string='Execution Time (ms)', readonly=True, digits=(16, 3))
+    planning_time = fields.Float(string='Planning Time (ms)', readonly=True, digits=(16, 3))
+    shared_hit_blocks = fields.Integer(string='Shared Buffers Hit', readonly=True)
+    shared_read_blocks = fields.Integer(string='Shared Buffers Read', readonly=True)
+    query = fields.Text(string='SQL', readonly=True)
+    plan = fields.Text(string='Plan', readonly=True)
+
+    @api.model
+    def action_capture_plans(self):
+        """Run EXPLAIN (ANALYZE, BUFFERS) on every report query and store the plans.
+
+        The queries are executed for real inside a savepoint that is rolled back.
+        """
+        vals_list = []
+        for name, query in self._get_diagnostic_queries():
+            savepoint = self.env.cr.savepoint(flush=False)
+            try:
+                self.env.cr.execute(SQL("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) %s", query))
+                result = self.env.cr.fetchone()[0][0]
+            except Exception as e:
+                _logger.warning(f'Error capturing the query plan of {name}: {str(e)}')
+                continue
+            finally:
+                savepoint.close(rollback=True)
+            vals_list.append({
+                'name': name,
+                'execution_time': result.get('Execution Time', 0.0),
+                'planning_time': result.get('Planning Time', 0.0),
+                'shared_hit_blocks': result['Plan'].get('Shared Hit Blocks', 0),
+                'shared_read_blocks': result['Plan'].get('Shared Read Blocks', 0),
+                'query': self.env.cr.mogrify(query.code, query.params).decode(),
+                'plan': json.dumps(result, indent=2),
+            })
+        plans = self.create(vals_list)
+        return {
+            'name': 'Query Plans',
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'view_mode': 'list,form',
+            'domain': [('id', 'in', plans.ids)],
+        }
+
+    @api.model
+    def _get_diagnostic_queries(self):
+        """Report queries to explain, as a list of ``(name, SQL)`` with representative parameters.
+
+        Modules adding report queries extend this list.
+        """
+        queries = []
+        today = fields.Datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        month_start = today.replace(day=1)
+        statement = self.env['report.vsr_changes.report_stock_statement']
+        for name, data in [
+            ('Stock Statement - current month', {
+                'date_start': fields.Datetime.to_string(month_start),
+                'date_end': fields.Datetime.to_string(today),
+            }),
+            ('Stock Statement - last 3 months by warehouse', {
+                'date_start': fields.Datetime.to_string(month_start - relativedelta(months=3)),
+                'date_end': fields.Datetime.to_string(month_start - relativedelta(seconds=1)),
+                'periods': [
+                    [fields.Datetime.to_string(month_start - relativedelta(months=offset)),
+                     fields.Datetime.to_string(month_start - relativedelta(months=offset - 1, seconds=1))]
+                    for offset in (3, 2, 1)
+                ],
+                'breakdown': 'warehouse',
+            }),
+        ]:
+            data.update(company_id=self.env.company.id, category_ids=[])
+            query, params = statement._get_statement_query(data)
+            queries.append((name, SQL(query, **params)))
+
+        # The dispatch report filters transfers on date_order, only available when a module adds it
+        if 'date_order' in self.env['stock.picking']._fields:
+            picking_query = self.env['stock.picking']._search([
+                ('date_order', '>=', month_start),
+                ('date_order', '<=', today),
+            ], order='date_order asc')
+            queries.append(('Dispatch Report - current month', picking_query.select()))
+        else:
+            _logger.info("Dispatch report query skipped: stock.picking has no date_order field")
+        return queries
@@ -1,4 +1,5 @@
-from odoo import models, fields, api
+from odoo import models, fields, api, Command
+from odoo.tools.sql import table_exists
 
 
 class ResPartner(models.Model):
@@ -10,6 +11,173 @@ class ResPartner(models.Model):
     ], string='Partner Type',
        help='Select whether this partner is a Vendor or Customer')
 
+    # Receivables exposure summary read by the sale order payment warnings.
+    # Stored per company in payment_exposure_ids; the figures below only count
+    # the companies of the current context, in the current company's currency.
+    payment_exposure_ids = fields.One2many(
+        'res.partner.payment.exposure',
+        'partner_id',
+        string='Receivables Exposure',
+        compute='_compute_payment_exposure_ids',
+        store=True,
+        help='Unpaid customer invoices of the partner per company'
+    )
+    payment_overdue_count = fields.Integer(
+        string='Overdue Invoices',
+        compute='_compute_payment_exposure'
+    )
+    payment_overdue_amount = fields.Float(
+        string='Overdue Amount',
+        compute='_compute_payment_exposure',
+        help='Residual amount of the overdue invoices of the allowed companies'
+    )
+    payment_pending_count = fields.Integer(
+        string='Pending Invoices',
+        compute='_compute_payment_exposure'
+    )
+    payment_pending_amount = fields.Float(
+        string='Pending Amount',
+        compute='_compute_payment_exposure',
+        help='Residual amount of the invoices not yet due of the allowed companies'
+    )
+    payment_order_refs = fields.Char(
+        string='Unpaid Sales Orders',
+        compute='_compute_payment_exposure',
+        help='Sales orders linked to the unpaid invoices'
+    )
+
+    def _auto_init(self):
+        """Schedule the exposure of the existing customers when its table is new"""
+        new_exposure = not table_exists(self.env.cr, 'res_partner_payment_exposure')
+        res = super()._auto_init()
+        if new_exposure:
+            # A One2many has no column, so the ORM never schedules its computation on install
+            self.pool.post_init(self._mark_payment_exposure_to_compute)
+        return res
+
+    def _mark_payment_exposure_to_compute(self):
+        partners = self.env['account.move']._read_group(
+            [('move_type', '=', 'out_invoice'), ('state', '=', 'posted'), ('payment_state', 'in', ('not_paid', 'partial'))],
+            aggregates=['partner_id:recordset'],
+        )[0][0]
+        self.env.add_to_compute(self._fields['payment_exposure_ids'], partners)
+
+    @api.depends(
+        'invoice_ids.state',
+        'invoice_ids.move_type',
+        'invoice_ids.company_id',
+        'invoice_ids.payment_state',
+        'invoice_ids.amount_residual_signed',
+        'invoice_ids.invoice_date_due',
+        'invoice_ids.invoice_line_ids.sale_line_ids.order_id.name',
+        'invoice_ids.invoice_line_ids.sale_line_ids.order_id.partner_id',
+    )
+    def _compute_payment_exposure_ids(self):
+        """Summarise unpaid customer invoices per partner and company with two grouped queries.
+
+        Amounts are the signed residuals, in the currency of each company.
+        """
+        partner_ids = [pid for pid in self._origin.ids if pid]
+        exposure = {}
+        order_refs = {}
+        if partner_ids:
+            self.env['account.move'].flush_model([
+                'partner_id', 'company_id', 'move_type', 'state', 'payment_state',
+                'amount_residual_signed', 'invoice_date_due',
+            ])
+            params = {'partner_ids': partner_ids, 'today': fields.Date.context_today(self)}
+            self.env.cr.execute("""
+                SELECT partner_id, company_id,
+                       COUNT(*) FILTER (WHERE invoice_date_due < %(today)s),
+                       COALESCE(SUM(amount_residual_signed) FILTER (WHERE invoice_date_due < %(today)s), 0.0),
+                       COUNT(*) FILTER (WHERE invoice_date_due IS NULL OR invoice_date_due >= %(today)s),
+                       COALESCE(SUM(amount_residual_signed) FILTER (WHERE invoice_date_due IS NULL OR invoice_date_due >= %(today)s), 0.0)
+                  FROM account_move
+                 WHERE partner_id = ANY(%(partner_ids)s)
+                   AND move_type = 'out_invoice'
+                   AND state = 'posted'
+                   AND payment_state IN ('not_paid', 'partial')
+              GROUP BY partner_id, company_id
+            """, params)
+            for partner_id, company_id, *figures in self.env.cr.fetchall():
+                exposure.setdefault(partner_id, {})[company_id] = figures
+
+            self.env['sale.order'].flush_model(['partner_id', 'name'])
+            self.env.cr.execute("""
+                SELECT so.partner_id, am.company_id, STRING_AGG(DISTINCT so.name, ', ' ORDER BY so.name)
+                  FROM sale_order so
+                  JOIN sale_order_line sol ON sol.order_id = so.id
+                  JOIN sale_order_line_invoice_rel rel ON rel.order_line_id = sol.id
+                  JOIN account_move_line aml ON aml.id = rel.invoice_line_id
+                  JOIN account_move am ON am.id = aml.move_id
+                 WHERE so.partner_id = ANY(%(partner_ids)s)
+                   AND am.partner_id = so.partner_id
+                   AND am.move_type = 'out_invoice'
+                   AND am.state = 'posted'
+                   AND am.payment_state IN ('not_paid', 'partial')
+              GROUP BY so.partner_id, am.company_id
+            """, params)
+            for partner_id, company_id, refs in self.env.cr.fetchall():
+                order_refs[(partner_id, company_id)] = refs
+
+        for partner in self:
+            summary = exposure.get(partner._origin.id, {})
+            # Update the lines in place by company, only touching those whose figures changed
+            existing = {line.company_id.id: line for line in partner.payment_exposure_ids}
+            commands = []
+            for company_id, (overdue_count, overdue_amount, pending_count, pending_amount) in summary.items():
+                vals = {
+                    'company_id': company_id,
+                    'overdue_count': overdue_count,
+                    'overdue_amount': overdue_amount,
+                    'pending_count': pending_count,
+                    'pending_amount': pending_amount,
+                    'order_refs': order_refs.get((partner._origin.id, company_id), False),
+                }
+                line = existing.pop(company_id, None)
+                if not line:
+                    commands.append(Command.create(vals))
+                elif (line.overdue_count != overdue_count or line.pending_count != pending_count
+                      or line.order_refs != vals['order_refs']
+                      or line.currency_id.compare_amounts(line.overdue_amount, overdue_amount)
+                      or line.currency_id.compare_amounts(line.pending_amount, pending_amount)):
+                    commands.append(Command.update(line.id, vals))
+            commands += [Command.delete(line.id) for line in existing.values()]
+            partner.payment_exposure_ids = commands
+
+    @api.depends(
+        'payment_exposure_ids.company_id',
+        'payment_exposure_ids.overdue_count',
+        'payment_exposure_ids.overdue_amount',
+        'payment_exposure_ids.pending_count',
+        'payment_exposure_ids.pending_amount',
+        'payment_exposure_ids.order_refs',
+    )
+    @api.depends_context('allowed_company_ids')
+    def _compute_payment_exposure(self):
+        """Add up the stored exposure of the allowed companies, converted to the current company's currency"""
+        company = self.env.company
+        today = fields.Date.context_today(self)
+        for partner in self:
+            lines = partner.payment_exposure_ids.filtered(lambda line: line.company_id in self.env.companies)
+            partner.payment_overdue_count = sum(lines.mapped('overdue_count'))
+            partner.payment_overdue_amount = sum(
+                line.currency_id._convert(line.overdue_amount, company.currency_id, company, today) for line in lines
+            )
+            partner.payment_pending_count = sum(lines.mapped('pending_count'))
+            partner.payment_pending_amount = sum(
+                line.currency_id._convert(line.pending_amount, company.currency_id, company, today) for line in lines
+            )
+            order_refs = {ref for line in lines if line.order_refs for ref in line.order_refs.split(', ')}
+            partner.payment_order_refs = ', '.join(sorted(order_refs)) or False
+
+    @api.model
+    def _cron_refresh_payment_exposure(self):
+        """Move pending invoices that reached their due date into the overdue figures"""
+        partners = self.env['res.partner.payment.exposure'].search([('pending_count', '>', 0)]).partner_id
+        self.env.add_to_compute(self._fields['payment_exposure_ids'], partners)
+        self.flush_model(['payment_exposure_ids'])
+
     @api.onchange('partner_type')
     def _onchange_partner_type(self):
         """Update supplier_rank and customer_rank based on partner_type"""
@@ -49,4 +217,19 @@ class ResPartner(models.Model):
                 vals['supplier_rank'] = 0
         
         result = super(ResPartner, self).write(vals)
-        return result
\ No newline at end of file
+        return result
+
+
+class ResPartnerPaymentExposure(models.Model):
+    _name = 'res.partner.payment.exposure'
+    _description = 'Customer Receivables Exposure'
+    _order = 'partner_id, company_id'
+
+    partner_id = fields.Many2one('res.partner', string='Customer', required=True, index=True, ondelete='cascade')
+    company_id = fields.Many2one('res.company', string='Company', required=True, ondelete='cascade')
+    currency_id = fields.Many2one(related='company_id.currency_id')
+    overdue_count = fields.Integer(string='Overdue Invoices')
+    overdue_amount = fields.Monetary(string='Overdue Amount', currency_field='currency_id')
+    pending_count = fields.Integer(string='Pending Invoices')
+    pending_amount = fields.Monetary(string='Pending Amount', currency_field='currency_id')
+    order_refs = fields.Char(string='Unpaid Sales Orders')
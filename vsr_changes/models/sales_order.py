@@ -1,3 +1,5 @@
+from markupsafe import Markup
+
 from odoo import models, fields, api
 import logging
 
@@ -16,44 +18,23 @@ class SaleOrderVSR(models.Model):
         if not self.partner_id:
             return
 
+        # Exposure is kept up to date on the partner as invoices are posted and paid
         partner = self.partner_id
         
-        unpaid_invoices = self.env['account.move'].search([
-            ('partner_id', '=', partner.id),
-            ('move_type', '=', 'out_invoice'),
-            ('payment_state', '=', 'not_paid'),
-            ('state', '=', 'posted'),
-        ])
-        
-        overdue_invoices = unpaid_invoices.filtered(lambda inv: inv.invoice_date_due and inv.invoice_date_due < fields.Date.today())
-
-        if not unpaid_invoices and not overdue_invoices:
+        if not partner.payment_overdue_count and not partner.payment_pending_count:
             return
 
         # Build warning message
         warning_parts = []
 
-        # Get related sales orders for all unpaid invoices
-        all_related_orders = self.env['sale.order'].search([
-            ('partner_id', '=', partner.id),
-            ('invoice_ids', 'in', unpaid_invoices.ids),
-        ]).mapped('name')
+        if partner.payment_overdue_count:
+            warning_parts.append(f"- {partner.payment_overdue_count} overdue invoice(s) totaling {partner.payment_overdue_amount:.2f}.")
         
-        order_numbers_str = ', '.join(all_related_orders) if all_related_orders else 'N/A'
-
-        if overdue_invoices:
-            overdue_count = len(overdue_invoices)
-            overdue_total = sum(overdue_invoices.mapped('amount_residual'))
-            warning_parts.append(f"- {overdue_count} overdue invoice(s) totaling {overdue_total:.2f}.")
-        
-        pending_invoices_not_overdue = unpaid_invoices - overdue_invoices
-        if pending_invoices_not_overdue:
-            pending_count = len(pending_invoices_not_overdue)
-            pending_total = sum(pending_invoices_not_overdue.mapped('amount_residual'))
-            warning_parts.append(f"- {pending_count} pending (not overdue) invoice(s) totaling {pending_total:.2f}.")
+        if partner.payment_pending_count:
+            warning_parts.append(f"- {partner.payment_pending_count} pending (not overdue) invoice(s) totaling {partner.payment_pending_amount:.2f}.")
         
-        if all_related_orders:
-            warning_parts.append(f"\nRelated Sales Orders: {order_numbers_str}")
+        if partner.payment_order_refs:
+            warning_parts.append(f"\nRelated Sales Orders: {partner.payment_order_refs}")
         
         warning_message = "\n".join(warning_parts)
         
@@ -68,50 +49,42 @@ class SaleOrderVSR(models.Model):
     # that was created before the partner had pending payments.
     def action_confirm(self):
         """Override action_confirm to log a message about pending/due payments"""
-        for order in self:
-            # Check if customer has pending or due payments
-            order._check_pending_payments()
+        # Check all orders at once so the cost follows the number of distinct customers
+        self._check_pending_payments()
         
         return super().action_confirm()
 
     def _check_pending_payments(self):
-        """Check for pending or due invoices for the customer and log to chatter."""
-        self.ensure_one()
-        
-        if not self.partner_id:
+        """Check for pending or due invoices of the customers and queue the chatter alerts in bulk."""
+        orders = self.filtered('partner_id')
+        if not orders:
             return
         
         try:
-            pending_invoices = self.env['account.move'].search([
-                ('partner_id', '=', self.partner_id.id),
-                ('move_type', '=', 'out_invoice'),
-                ('payment_state', 'in', ['not_paid', 'partial']),
-                ('state', '=', 'posted'),
+            # One read of the exposure summary for every distinct customer
+            partners = orders.partner_id
+            partners.payment_exposure_ids.fetch([
+                'company_id', 'overdue_count', 'overdue_amount', 'pending_count', 'pending_amount',
             ])
             
-            overdue_invoices = pending_invoices.filtered(lambda inv: inv.invoice_date_due and inv.invoice_date_due < fields.Date.today())
-            
-            if not pending_invoices and not overdue_invoices:
-                return
-
-            alert_parts = []
-            
-            if overdue_invoices:
-                overdue_count = len(overdue_invoices)
-                overdue_total = sum(overdue_invoices.mapped('amount_residual'))
-                alert_parts.append(f"- {overdue_count} overdue invoice(s) totaling {overdue_total:.2f}.")
-
-            pending_not_overdue = pending_invoices - overdue_invoices
-            if pending_not_overdue:
-                pending_count = len(pending_not_overdue)
-                pending_total = sum(pending_not_overdue.mapped('amount_residual'))
-                alert_parts.append(f"- {pending_count} pending invoice(s) totaling {pending_total:.2f}.")
-            
-            alert_message = "\n".join(alert_parts)
+            alerts = {}
+            for partner in partners:
+                alert_parts = []
+                
+                if partner.payment_overdue_count:
+                    alert_parts.append(f"- {partner.payment_overdue_count} overdue invoice(s) totaling {partner.payment_overdue_amount:.2f}.")
+
+                if partner.payment_pending_count:
+                    alert_parts.append(f"- {partner.payment_pending_count} pending invoice(s) totaling {partner.payment_pending_amount:.2f}.")
+                
+                if alert_parts:
+                    alerts[partner.id] = Markup("<strong>Payment Confirmation Alert:</strong><br/>%s") % (
+                        Markup("<br/>").join(alert_parts)
+                    )
             
-            if alert_message:
-                self.message_post(body=f"<strong>Payment Confirmation Alert:</strong>\n{alert_message}")
-        
+            bodies = {order.id: alerts[order.partner_id.id] for order in orders if order.partner_id.id in alerts}
+            # Posted by the notification queue after commit, off the confirmation path
+            self.env['vsr.notification.queue']._enqueue(self._name, bodies)
 
         except Exception as e:
             _logger.warning(f'Error checking payments during confirmation: {str(e)}')
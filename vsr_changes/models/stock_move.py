@@ -1,4 +1,7 @@
+from collections import defaultdict
+
 from odoo import models, fields, api
+from odoo.tools.sql import create_index
 
 class StockMoveVSR(models.Model):
     _inherit = 'stock.move'
@@ -66,21 +69,111 @@ class StockMoveVSR(models.Model):
                 if not move.vsr_tax_ids:
                     move.vsr_tax_ids = False
 
+    def init(self):
+        super().init()
+        # Done moves scanned by company and date in the stock statement and its snapshots
+        create_index(
+            self.env.cr, 'stock_move_done_company_date_product_index', self._table,
+            ['company_id', 'date', 'product_id'], where="state = 'done'",
+        )
+
+    def _action_done(self, cancel_backorder=False):
+        moves = super()._action_done(cancel_backorder=cancel_backorder)
+        # Keep the stock statement snapshots right when moves are done with a past date
+        self.env['vsr.stock.snapshot'].sudo()._apply_backdated_moves(moves)
+        return moves
+
     @api.depends('rate', 'product_uom_qty', 'vsr_tax_ids')
     def _compute_totals(self):
+        tax_results = self._get_vsr_tax_results()
         for move in self:
-            move.subtotal = move.rate * move.product_uom_qty
-            
-            if move.vsr_tax_ids and move.subtotal:
-                tax_results = move.vsr_tax_ids.compute_all(
-                    move.rate,
-                    currency=move.currency_id,
-                    quantity=move.product_uom_qty,
-                    product=move.product_id,
-                    partner=move.picking_id.partner_id if move.picking_id else None
-                )
-                move.tax_amount = sum(tax['amount'] for tax in tax_results['taxes'])
-                move.total = tax_results['total_included']
-            else:
-                move.tax_amount = 0.0
-                move.total = move.subtotal
+            result = tax_results[move.id]
+            move.subtotal = result['subtotal']
+            move.tax_amount = result['tax_amount']
+            move.total = result['total']
+
+    def _get_vsr_tax_results(self):
+        """Compute the taxes of the moves in batch.
+
+        Moves sharing taxes, rate, currency and fiscal partner are evaluated
+        together: groups made only of plain percent taxes are computed directly
+        from the tax rates, the others go through ``compute_all``. Within the call,
+        moves with the same quantity (and product, for other taxes) share one result.
+
+        Returns ``{move.id: {'subtotal', 'tax_amount', 'total', 'taxes'}}`` where
+        ``taxes`` is a list of ``{'id', 'name', 'base', 'amount'}``.
+        """
+        memo = {}
+        groups = defaultdict(list)
+        for move in self:
+            key = (
+                tuple(sorted(move.vsr_tax_ids.ids)), move.rate,
+                move.currency_id.id, move.picking_id.partner_id.id, move.company_id.id,
+            )
+            groups[key].append(move)
+
+        results = {}
+        for (tax_ids, rate, currency_id, partner_id, company_id), moves in groups.items():
+            taxes = self.env['account.tax'].browse(tax_ids)
+            currency = self.env['res.currency'].browse(currency_id)
+            partner = self.env['res.partner'].browse(partner_id)
+            company = self.env['res.company'].browse(company_id)
+            simple = all(
+                tax.amount_type == 'percent' and not tax.price_include and not tax.include_base_amount
+                for tax in taxes
+            )
+            round_per_line = company.tax_calculation_rounding_method != 'round_globally'
+            for move in moves:
+                quantity = move.product_uom_qty
+                # Plain percent taxes do not depend on the product
+                memo_key = (tax_ids, rate, currency_id, partner_id, company_id, quantity,
+                            None if simple else move.product_id.id)
+                if memo_key not in memo:
+                    subtotal = rate * quantity
+                    if not taxes or not subtotal:
+                        memo[memo_key] = {'subtotal': subtotal, 'tax_amount': 0.0, 'total': subtotal, 'taxes': []}
+                    elif simple:
+                        memo[memo_key] = self._vsr_percent_tax_result(taxes, subtotal, currency, round_per_line)
+                    else:
+                        tax_results = taxes.compute_all(
+                            rate,
+                            currency=currency,
+                            quantity=quantity,
+                            product=move.product_id,
+                            partner=partner or None,
+                        )
+                        tax_lines = [{
+                            'id': tax['id'],
+                            'name': tax['name'],
+                            'base': tax['base'],
+                            'amount': tax['amount'],
+                        } for tax in tax_results['taxes']]
+                        memo[memo_key] = {
+                            'subtotal': subtotal,
+                            'tax_amount': sum(tax['amount'] for tax in tax_lines),
+                            'total': tax_results['total_included'],
+                            'taxes': tax_lines,
+                        }
+                results[move.id] = memo[memo_key]
+        return results
+
+    @api.model
+    def _vsr_percent_tax_result(self, taxes, subtotal, currency, round_per_line):
+        """Tax result of price-excluded percent taxes applied on ``subtotal``"""
+        base = currency.round(subtotal) if round_per_line else subtotal
+        tax_lines = []
+        for tax in taxes.sorted(lambda tax: (tax.sequence, tax.id)):
+            amount = base * tax.amount / 100.0
+            tax_lines.append({
+                'id': tax.id,
+                'name': tax.name,
+                'base': base,
+                'amount': currency.round(amount) if round_per_line else amount,
+            })
+        tax_amount = sum(tax['amount'] for tax in tax_lines)
+        return {
+            'subtotal': subtotal,
+            'tax_amount': tax_amount,
+            'total': base + tax_amount,
+            'taxes': tax_lines,
+        }
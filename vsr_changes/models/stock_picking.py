@@ -1,4 +1,8 @@
-from odoo import models, fields, api
+from collections import defaultdict
+
+from odoo import models, fields, api, Command
+from odoo.tools.sql import column_exists, create_column, table_exists
+
 
 class StockPickingVSR(models.Model):
     _inherit = 'stock.picking'
@@ -13,6 +17,7 @@ class StockPickingVSR(models.Model):
     amount_untaxed = fields.Monetary(
         string='Untaxed Amount',
         compute='_compute_amounts',
+        store=True,
         currency_field='currency_id',
         help='Sum of all move subtotals'
     )
@@ -20,6 +25,7 @@ class StockPickingVSR(models.Model):
     amount_tax = fields.Monetary(
         string='Taxes',
         compute='_compute_amounts',
+        store=True,
         currency_field='currency_id',
         help='Sum of all move tax amounts'
     )
@@ -27,44 +33,147 @@ class StockPickingVSR(models.Model):
     amount_total = fields.Monetary(
         string='Total',
         compute='_compute_amounts',
+        store=True,
         currency_field='currency_id',
         help='Sum of all move totals (including taxes)'
     )
+
+    vsr_tax_summary_ids = fields.One2many(
+        'stock.picking.vsr.tax',
+        'picking_id',
+        string='Tax Summary',
+        compute='_compute_vsr_tax_summary',
+        store=True,
+        help='Tax base and amount of the receipt per tax'
+    )
     
+    def _auto_init(self):
+        """Fill the stored amounts in SQL when their columns are first created, and
+        schedule the tax summary of the existing receipts when its table is new"""
+        cr = self.env.cr
+        if not column_exists(cr, 'stock_picking', 'amount_total') and column_exists(cr, 'stock_move', 'total'):
+            for column in ('amount_untaxed', 'amount_tax', 'amount_total'):
+                create_column(cr, 'stock_picking', column, 'numeric')
+            self._backfill_amounts()
+        new_tax_summary = not table_exists(cr, 'stock_picking_vsr_tax')
+        res = super()._auto_init()
+        if new_tax_summary:
+            # A One2many has no column, so the ORM never schedules its computation on
+            # install; mark the receipts once every model is initialized, like new columns
+            self.pool.post_init(self._mark_tax_summary_to_compute)
+        return res
+
+    def _mark_tax_summary_to_compute(self):
+        self.env.add_to_compute(self._fields['vsr_tax_summary_ids'], self._get_tax_summary_pickings())
+
+    @api.model
+    def _get_tax_summary_pickings(self):
+        return self.with_context(active_test=False).search([('picking_type_code', '=', 'incoming')], order='id')
+
+    @api.model
+    def _backfill_amounts(self, batch_size=50000):
+        """Aggregate the stored move totals into the picking amounts, one id range at a time"""
+        cr = self.env.cr
+        cr.execute("SELECT MIN(id), MAX(id) FROM stock_picking")
+        min_id, max_id = cr.fetchone()
+        if min_id is None:
+            return
+        for start in range(min_id, max_id + 1, batch_size):
+            # Same moves as move_ids_without_package
+            cr.execute("""
+                UPDATE stock_picking sp
+                   SET amount_untaxed = COALESCE(totals.untaxed, 0.0),
+                       amount_tax = COALESCE(totals.tax, 0.0),
+                       amount_total = COALESCE(totals.total, 0.0)
+                  FROM stock_picking p
+             LEFT JOIN (
+                    SELECT sm.picking_id,
+                           SUM(sm.subtotal) AS untaxed,
+                           SUM(sm.tax_amount) AS tax,
+                           SUM(sm.total) AS total
+                      FROM stock_move sm
+                 LEFT JOIN stock_picking_type spt ON spt.id = sm.picking_type_id
+                     WHERE sm.picking_id >= %s AND sm.picking_id < %s
+                       AND (sm.package_level_id IS NULL OR NOT COALESCE(spt.show_entire_packs, FALSE))
+                  GROUP BY sm.picking_id
+                ) totals ON totals.picking_id = p.id
+                 WHERE sp.id = p.id
+                   AND p.id >= %s AND p.id < %s
+            """, [start, start + batch_size, start, start + batch_size])
+
     @api.depends('move_ids_without_package.subtotal', 'move_ids_without_package.tax_amount', 'move_ids_without_package.total')
     def _compute_amounts(self):
+        # Saved pickings are aggregated in SQL, pickings being edited from their cached moves
+        stored = self.filtered('id')
+        totals = {}
+        if stored:
+            domain = [('picking_id', 'in', stored.ids)] + self._fields['move_ids_without_package'].get_domain_list(self)
+            for picking, subtotal, tax_amount, total in self.env['stock.move']._read_group(
+                domain, ['picking_id'], ['subtotal:sum', 'tax_amount:sum', 'total:sum'],
+            ):
+                totals[picking.id] = (subtotal, tax_amount, total)
+        for picking in self - stored:
+            moves = picking.move_ids_without_package
+            totals[picking.id] = (
+                sum(moves.mapped('subtotal')),
+                sum(moves.mapped('tax_amount')),
+                sum(moves.mapped('total')),
+            )
         for picking in self:
-            amount_untaxed = sum(move.subtotal for move in picking.move_ids_without_package)
-            amount_tax = sum(move.tax_amount for move in picking.move_ids_without_package)
-            amount_total = sum(move.total for move in picking.move_ids_without_package)
-            
-            picking.amount_untaxed = amount_untaxed
-            picking.amount_tax = amount_tax
-            picking.amount_total = amount_total
-    
+            picking.amount_untaxed, picking.amount_tax, picking.amount_total = totals.get(picking.id, (0.0, 0.0, 0.0))
+
+    @api.depends('partner_id', 'move_ids.rate', 'move_ids.product_uom_qty', 'move_ids.vsr_tax_ids')
+    def _compute_vsr_tax_summary(self):
+        tax_results = self.move_ids._get_vsr_tax_results()
+        for picking in self:
+            summary = {}
+            for move in picking.move_ids:
+                for tax in tax_results[move.id]['taxes']:
+                    line = summary.setdefault(tax['id'], {'tax_id': tax['id'], 'base': 0.0, 'amount': 0.0})
+                    line['base'] += tax['base']
+                    line['amount'] += tax['amount']
+            # Update the lines in place by tax, only touching those whose figures changed
+            existing = {line.tax_id.id: line for line in picking.vsr_tax_summary_ids}
+            commands = []
+            for tax_id, vals in summary.items():
+                line = existing.pop(tax_id, None)
+                if not line:
+                    commands.append(Command.create(vals))
+                elif (picking.currency_id.compare_amounts(line.base, vals['base'])
+                      or picking.currency_id.compare_amounts(line.amount, vals['amount'])):
+                    commands.append(Command.update(line.id, {'base': vals['base'], 'amount': vals['amount']}))
+            commands += [Command.delete(line.id) for line in existing.values()]
+            picking.vsr_tax_summary_ids = commands
+
+    def _action_done(self):
+        res = super()._action_done()
+        deliveries = self.filtered(lambda p: p.state == 'done' and p.picking_type_code == 'outgoing')
+        if deliveries:
+            self.env['account.move']._link_delivery_pickings(picking_ids=deliveries.ids)
+        return res
+
     def get_tax_details(self):
         """Get tax breakdown by tax name"""
         self.ensure_one()
-        tax_details = {}
-        
-        for move in self.move_ids_without_package:
-            if move.vsr_tax_ids and move.subtotal:
-                tax_results = move.vsr_tax_ids.compute_all(
-                    move.rate,
-                    currency=self.currency_id,
-                    quantity=move.product_uom_qty,
-                    product=move.product_id,
-                    partner=self.partner_id
-                )
-                for tax in tax_results['taxes']:
-                    tax_name = tax['name']
-                    tax_amount = tax['amount']
-                    if tax_name in tax_details:
-                        tax_details[tax_name] += tax_amount
-                    else:
-                        tax_details[tax_name] = tax_amount
-        
-        return tax_details
+        tax_details = defaultdict(float)
+        for line in self.vsr_tax_summary_ids:
+            tax_details[line.tax_id.name] += line.amount
+        return dict(tax_details)
+
+
+class StockPickingVSRTax(models.Model):
+    _name = 'stock.picking.vsr.tax'
+    _description = 'Receipt Tax Summary'
+    _order = 'picking_id, sequence, id'
+
+    picking_id = fields.Many2one('stock.picking', string='Transfer', required=True, index=True, ondelete='cascade')
+    tax_id = fields.Many2one('account.tax', string='Tax', required=True, ondelete='cascade')
+    sequence = fields.Integer(related='tax_id.sequence')
+    currency_id = fields.Many2one(related='picking_id.currency_id')
+    base = fields.Monetary(string='Base', currency_field='currency_id')
+    amount = fields.Monetary(string='Tax Amount', currency_field='currency_id')
+
+
 class stock_picking(models.Model):
     _inherit = 'stock.picking'
 
@@ -0,0 +1,124 @@
+from odoo import models, fields, api
+from datetime import timedelta
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Signed quantity of a done move for the company stock: in to or out of internal locations
+MOVE_QTY_SQL = """
+    CASE WHEN ld.usage = 'internal' AND ls.usage != 'internal' THEN m.product_qty
+         WHEN ls.usage = 'internal' AND ld.usage != 'internal' THEN -m.product_qty
+         ELSE 0 END
+"""
+
+
+class StockSnapshot(models.Model):
+    _name = 'vsr.stock.snapshot'
+    _description = 'Stock Statement Closing Snapshot'
+    _order = 'date desc, product_id'
+    _rec_name = 'product_id'
+
+    product_id = fields.Many2one('product.product', string='Product', required=True, readonly=True, ondelete='cascade')
+    company_id = fields.Many2one('res.company', string='Company', required=True, readonly=True, ondelete='cascade')
+    date = fields.Date(string='Closing Date', required=True, readonly=True, help='Includes every done move up to the end of this day (UTC)')
+    quantity = fields.Float(string='Closing Quantity', digits='Product Unit of Measure', readonly=True)
+
+    _sql_constraints = [
+        ('company_date_product_uniq', 'unique(company_id, date, product_id)', 'Only one snapshot per product, company and date.'),
+    ]
+
+    @api.model
+    def _get_snapshot_date(self, company_id, date_start):
+        """Latest closing date fully before ``date_start`` (a datetime), or None"""
+        self.env.cr.execute("""
+            SELECT MAX(date)
+              FROM vsr_stock_snapshot
+             WHERE company_id = %s
+               AND date + 1 <= %s
+        """, [company_id, date_start])
+        return self.env.cr.fetchone()[0]
+
+    @api.model
+    def _take_snapshot(self, company_id, date):
+        """Store the closing quantities of ``date`` from the previous snapshot and the moves since"""
+        previous_date = self._get_snapshot_date(company_id, date)
+        self.flush_model()
+        self.env['stock.move'].flush_model(['state', 'company_id', 'date', 'product_id', 'product_qty', 'location_id', 'location_dest_id'])
+        self.env.cr.execute(f"""
+            INSERT INTO vsr_stock_snapshot (product_id, company_id, date, quantity, create_uid, create_date, write_uid, write_date)
+            SELECT q.product_id, %(company_id)s, %(date)s, SUM(q.quantity),
+                   %(uid)s, NOW() AT TIME ZONE 'UTC', %(uid)s, NOW() AT TIME ZONE 'UTC'
+              FROM (
+                    SELECT product_id, quantity
+                      FROM vsr_stock_snapshot
+                     WHERE company_id = %(company_id)s
+                       AND date = %(previous_date)s
+                 UNION ALL
+                    SELECT m.product_id, {MOVE_QTY_SQL}
+                      FROM stock_move m
+                      JOIN stock_location ls ON m.location_id = ls.id
+                      JOIN stock_location ld ON m.location_dest_id = ld.id
+                     WHERE m.state = 'done'
+                       AND m.company_id = %(company_id)s
+                       AND m.date >= COALESCE(%(previous_date)s::date + 1, '-infinity'::timestamp)
+                       AND m.date < %(date)s::date + 1
+                   ) q
+          GROUP BY q.product_id
+            HAVING ROUND(SUM(q.quantity)::numeric, 6) != 0
+            ON CONFLICT (company_id, date, product_id) DO NOTHING
+        """, {
+            'company_id': company_id,
+            'date': date,
+            'previous_date': previous_date,
+            'uid': self.env.uid,
+        })
+        self.invalidate_model()
+
+    @api.model
+    def _cron_take_snapshots(self):
+        """Snapshot yesterday's closing stock of every company (only month ends in monthly mode)"""
+        interval = self.env['ir.config_parameter'].sudo().get_param('vsr_changes.stock_snapshot_interval', 'day')
+        yesterday = fields.Date.today() - timedelta(days=1)
+        if interval == 'month' and (yesterday + timedelta(days=1)).day != 1:
+            return
+        for company in self.env['res.company'].search([]):
+            self._take_snapshot(company.id, yesterday)
+            self.env.cr.commit()
+            _logger.info("Stock snapshot of %s taken for company %s", yesterday, company.name)
+
+    @api.model
+    def _apply_backdated_moves(self, moves):
+        """Add done moves dated before existing snapshots to those snapshots"""
+        moves = moves.filtered(lambda m: m.state == 'done')
+        if not moves:
+            return
+        self.env.cr.execute("""
+            SELECT company_id, MAX(date)
+              FROM vsr_stock_snapshot
+             WHERE company_id = ANY(%s)
+          GROUP BY company_id
+        """, [moves.company_id.ids])
+        latest_dates = dict(self.env.cr.fetchall())
+        backdated = moves.filtered(
+            lambda m: m.company_id.id in latest_dates
+            and m.date.date() <= latest_dates[m.company_id.id]
+        )
+        if not backdated:
+            return
+        backdated.flush_recordset(['state', 'company_id', 'date', 'product_id', 'product_qty', 'location_id', 'location_dest_id'])
+        self.env.cr.execute(f"""
+            INSERT INTO vsr_stock_snapshot (product_id, company_id, date, quantity, create_uid, create_date, write_uid, write_date)
+            SELECT m.product_id, m.company_id, s.date, SUM({MOVE_QTY_SQL}),
+                   %(uid)s, NOW() AT TIME ZONE 'UTC', %(uid)s, NOW() AT TIME ZONE 'UTC'
+              FROM stock_move m
+              JOIN stock_location ls ON m.location_id = ls.id
+              JOIN stock_location ld ON m.location_dest_id = ld.id
+              JOIN (SELECT DISTINCT company_id, date FROM vsr_stock_snapshot) s
+                ON s.company_id = m.company_id AND m.date < s.date + 1
+             WHERE m.id = ANY(%(move_ids)s)
+          GROUP BY m.product_id, m.company_id, s.date
+            ON CONFLICT (company_id, date, product_id)
+            DO UPDATE SET quantity = vsr_stock_snapshot.quantity + EXCLUDED.quantity,
+                          write_date = EXCLUDED.write_date
+        """, {'move_ids': backdated.ids, 'uid': self.env.uid})
+        self.invalidate_model()
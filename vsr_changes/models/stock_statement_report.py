@@ -1,5 +1,21 @@
-from odoo import models, api, _
-from datetime import datetime, timedelta
+from odoo import models, fields, api, _
+
+# Columns of the exported statement, in the order of the printed report
+EXPORT_COLUMNS = [
+    ('category_name', 'Category'),
+    ('code', 'Code'),
+    ('name', 'Product'),
+    ('period', 'Period'),
+    ('location_name', 'Warehouse / Location'),
+    ('receipt', 'Receipt'),
+    ('opening', 'Opening Stock'),
+    ('total', 'Total'),
+    ('issue', 'Issued'),
+    ('closing', 'Closing Stock'),
+    ('physical', 'Physical'),
+    ('difference', 'Difference'),
+]
+
 
 class StockStatementReport(models.AbstractModel):
     _name = 'report.vsr_changes.report_stock_statement'
@@ -9,97 +25,19 @@ class StockStatementReport(models.AbstractModel):
     def _get_report_values(self, docids, data=None):
         if not data:
             return {}
-        
+
         date_start = data.get('date_start')
         date_end = data.get('date_end')
         company_id = data.get('company_id')
-        category_ids = data.get('category_ids')
-        
-        # Calculate previous day for opening stock
-        # Handle both date and datetime formats by extracting only the date portion
-        date_start_only = date_start.split(' ')[0] if ' ' in date_start else date_start
-        date_start_obj = datetime.strptime(date_start_only, '%Y-%m-%d')
-        previous_day = (date_start_obj - timedelta(days=1)).strftime('%Y-%m-%d')
-        
-        # Build SQL query
-        where_categ = ""
-        if category_ids:
-            where_categ = f"AND pt.categ_id IN ({','.join(map(str, category_ids))})"
-
-        query = f"""
-            SELECT 
-                categ.name as category_name,
-                p.default_code as code,
-                pt.name->>'en_US' as name, 
-                m.product_id,
-                -- Opening: Closing stock from previous day (all moves before start date)
-                SUM(CASE 
-                    WHEN m.date < %s AND ld.usage = 'internal' AND ls.usage != 'internal' THEN m.product_qty 
-                    WHEN m.date < %s AND ls.usage = 'internal' AND ld.usage != 'internal' THEN -m.product_qty 
-                    ELSE 0 END) as opening,
-                -- Receipt: All incoming to internal locations (In period)
-                SUM(CASE 
-                    WHEN m.date >= %s AND m.date <= %s AND ld.usage = 'internal' AND ls.usage != 'internal' THEN m.product_qty 
-                    ELSE 0 END) as receipt,
-                -- Issue: All outgoing from internal locations (In period)
-                SUM(CASE 
-                    WHEN m.date >= %s AND m.date <= %s AND ls.usage = 'internal' AND ld.usage != 'internal' THEN m.product_qty 
-                    ELSE 0 END) as issue,
-                -- Physical: Inventory adjustments (In period) - actual count
-                SUM(CASE 
-                    WHEN m.date >= %s AND m.date <= %s AND ld.usage = 'internal' AND ls.usage = 'inventory' THEN m.product_qty 
-                    WHEN m.date >= %s AND m.date <= %s AND ls.usage = 'internal' AND ld.usage = 'inventory' THEN -m.product_qty
-                    ELSE 0 END) as physical_adjustment
-            FROM product_product p
-            JOIN product_template pt ON p.product_tmpl_id = pt.id
-            JOIN product_category categ ON pt.categ_id = categ.id
-            LEFT JOIN stock_move m ON m.product_id = p.id AND m.state = 'done' AND m.company_id = %s
-            LEFT JOIN stock_location ls ON m.location_id = ls.id
-            LEFT JOIN stock_location ld ON m.location_dest_id = ld.id
-            WHERE pt.type IN ('product', 'consu')
-            {where_categ}
-            GROUP BY categ.name, m.product_id, p.default_code, pt.name, p.id
-            ORDER BY categ.name, pt.name
-        """
-        
-        params = [date_start, date_start,  # Opening
-                  date_start, date_end,     # Receipt
-                  date_start, date_end,     # Issue
-                  date_start, date_end, date_start, date_end,  # Physical adjustment
-                  company_id]
-        
-        self.env.cr.execute(query, tuple(params))
+
+        query, params = self._get_statement_query(data)
+        self.env.cr.execute(query, params)
         lines = self.env.cr.dictfetchall()
-        
+
         # Prepare groupings
         grouped_lines = {}
         for line in lines:
-            line['opening'] = line['opening'] or 0.0
-            line['receipt'] = line['receipt'] or 0.0
-            line['issue'] = line['issue'] or 0.0
-            physical_adjustment = line['physical_adjustment'] or 0.0
-            
-            # Total = Opening + Receipt
-            line['total'] = line['opening'] + line['receipt']
-            
-            # Closing Stock = Opening + Receipt - Issue (calculated stock)
-            line['closing'] = line['total'] - line['issue']
-            
-            # Physical Stock = Closing + Physical Adjustment
-            # - If NO inventory adjustment done: physical_adjustment = 0, so Physical = Closing
-            # - If inventory adjustment done: Physical = Closing + Adjustment (the actual counted stock)
-            line['physical'] = physical_adjustment
-            
-            # Difference = Physical - Closing
-            # - If Physical = Closing, then Difference = 0
-            # - If Physical > Closing, then Difference is positive (surplus/gain)
-            # - If Physical < Closing, then Difference is negative (shortage/loss)
-            line['difference'] = line['physical'] - line['closing']
-            
-            # Only show difference if it's not zero
-            if abs(line['difference']) < 0.01:  # Avoid floating point issues
-                line['difference'] = 0.0
-            
+            self._compute_statement_line(line)
             categ = line['category_name']
             if categ not in grouped_lines:
                 grouped_lines[categ] = []
@@ -112,7 +50,193 @@ class StockStatementReport(models.AbstractModel):
             'doc_model': 'vsr.stock.statement.wizard',
             'data': data,
             'lines': grouped_lines,
+            'show_period': len(data.get('periods') or []) > 1,
+            'show_location': (data.get('breakdown') or 'none') != 'none',
             'date_start': date_start,
             'date_end': date_end,
             'company': company,
         }
+
+    @api.model
+    def _get_location_buckets(self, company_id, breakdown, warehouse_ids):
+        """Map the internal locations of the company to the column they are reported in.
+
+        The bucket is the warehouse or the location itself for the breakdowns, and 0
+        when the statement is company-wide. Locations left out of the map (other
+        warehouses, non-internal locations) are treated as outside the stock.
+        """
+        domain = [('usage', '=', 'internal'), ('company_id', 'in', [company_id, False])]
+        if warehouse_ids:
+            domain.append(('warehouse_id', 'in', warehouse_ids))
+        locations = self.env['stock.location'].with_context(active_test=False).search_fetch(domain, ['warehouse_id'])
+        if breakdown == 'warehouse':
+            buckets = [location.warehouse_id.id or 0 for location in locations]
+        elif breakdown == 'location':
+            buckets = locations.ids
+        else:
+            buckets = [0] * len(locations)
+        return locations.ids, buckets
+
+    @api.model
+    def _get_statement_query(self, data):
+        """Build the statement query shared by the PDF report and the file exports.
+
+        Every period and location column is computed in a single scan of the done
+        moves: each move is split into an incoming leg for the bucket of its
+        destination and an outgoing leg for the bucket of its source, moves within
+        one bucket cancel out.
+        """
+        company_id = data.get('company_id')
+        category_ids = data.get('category_ids') or []
+        breakdown = data.get('breakdown') or 'none'
+        warehouse_ids = data.get('warehouse_ids') or []
+        periods = data.get('periods') or [[data.get('date_start'), data.get('date_end')]]
+
+        location_ids, bucket_ids = self._get_location_buckets(company_id, breakdown, warehouse_ids)
+
+        # Company-wide openings start from the latest closing snapshot before the first period
+        snapshot_date = None
+        if breakdown == 'none' and not warehouse_ids:
+            snapshot_date = self.env['vsr.stock.snapshot']._get_snapshot_date(company_id, min(period[0] for period in periods))
+
+        query = """
+            WITH location_map AS (
+                SELECT * FROM unnest(%(location_ids)s::int[], %(bucket_ids)s::int[]) AS lm(location_id, bucket_id)
+            ), periods AS (
+                SELECT * FROM unnest(%(period_starts)s::timestamp[], %(period_ends)s::timestamp[])
+                    WITH ORDINALITY AS per(date_start, date_end, period_index)
+            ), legs AS (
+                SELECT m.product_id, leg.bucket_id, m.date, leg.qty, leg.is_inventory
+                  FROM stock_move m
+                  JOIN stock_location ls ON m.location_id = ls.id
+                  JOIN stock_location ld ON m.location_dest_id = ld.id
+             LEFT JOIN location_map src ON src.location_id = m.location_id
+             LEFT JOIN location_map dst ON dst.location_id = m.location_dest_id
+            CROSS JOIN LATERAL (VALUES
+                        -- Receipt leg into the destination bucket
+                        (dst.bucket_id, m.product_qty, ls.usage = 'inventory'),
+                        -- Issue leg out of the source bucket
+                        (src.bucket_id, -m.product_qty, ld.usage = 'inventory')
+                   ) AS leg(bucket_id, qty, is_inventory)
+                 WHERE m.state = 'done'
+                   AND m.company_id = %(company_id)s
+                   AND m.date >= COALESCE(%(snapshot_date)s::date + 1, '-infinity'::timestamp)
+                   AND m.date <= (SELECT MAX(date_end) FROM periods)
+                   AND src.bucket_id IS DISTINCT FROM dst.bucket_id
+                   AND leg.bucket_id IS NOT NULL
+            ), cells AS (
+                SELECT l.product_id, l.bucket_id, per.period_index,
+                       -- Opening: Closing stock before the period start
+                       SUM(l.qty) FILTER (WHERE l.date < per.date_start) AS opening,
+                       -- Receipt: All incoming to the bucket (In period)
+                       SUM(l.qty) FILTER (WHERE l.date >= per.date_start AND l.qty > 0) AS receipt,
+                       -- Issue: All outgoing from the bucket (In period)
+                       -SUM(l.qty) FILTER (WHERE l.date >= per.date_start AND l.qty < 0) AS issue,
+                       -- Physical: Inventory adjustments (In period) - actual count
+                       SUM(l.qty) FILTER (WHERE l.date >= per.date_start AND l.is_inventory) AS physical_adjustment
+                  FROM legs l
+                  JOIN periods per ON l.date <= per.date_end
+              GROUP BY l.product_id, l.bucket_id, per.period_index
+            ), snapshot AS (
+                SELECT product_id, quantity
+                  FROM vsr_stock_snapshot
+                 WHERE company_id = %(company_id)s
+                   AND date = %(snapshot_date)s
+            ), report_keys AS (
+                -- Company-wide statements list every product, breakdowns the buckets with stock moves
+                SELECT DISTINCT product_id, bucket_id FROM cells WHERE %(breakdown)s != 'none'
+             UNION ALL
+                SELECT id, 0 FROM product_product WHERE %(breakdown)s = 'none'
+            )
+            SELECT
+                categ.name as category_name,
+                p.default_code as code,
+                pt.name->>'en_US' as name,
+                p.id as product_id,
+                per.period_index,
+                per.date_start as period_start,
+                per.date_end as period_end,
+                k.bucket_id,
+                COALESCE(wh.name, loc.complete_name) as location_name,
+                COALESCE(snapshot.quantity, 0) + COALESCE(c.opening, 0) as opening,
+                c.receipt,
+                c.issue,
+                c.physical_adjustment
+            FROM report_keys k
+            JOIN product_product p ON p.id = k.product_id
+            JOIN product_template pt ON p.product_tmpl_id = pt.id
+            JOIN product_category categ ON pt.categ_id = categ.id
+            CROSS JOIN periods per
+            LEFT JOIN cells c ON c.product_id = k.product_id AND c.bucket_id = k.bucket_id AND c.period_index = per.period_index
+            LEFT JOIN snapshot ON snapshot.product_id = k.product_id
+            LEFT JOIN stock_warehouse wh ON wh.id = k.bucket_id AND %(breakdown)s = 'warehouse'
+            LEFT JOIN stock_location loc ON loc.id = k.bucket_id AND %(breakdown)s = 'location'
+            WHERE pt.type IN ('product', 'consu')
+              AND (%(all_categories)s OR pt.categ_id = ANY(%(category_ids)s))
+            ORDER BY categ.name, pt.name, p.id, location_name, per.period_index
+        """
+
+        params = {
+            'location_ids': location_ids,
+            'bucket_ids': bucket_ids,
+            'period_starts': [period[0] for period in periods],
+            'period_ends': [period[1] for period in periods],
+            'company_id': company_id,
+            'snapshot_date': snapshot_date,
+            'breakdown': breakdown,
+            'all_categories': not category_ids,
+            'category_ids': category_ids,
+        }
+
+        return query, params
+
+    @api.model
+    def _compute_statement_line(self, line):
+        """Fill the derived columns of a statement row in place"""
+        line['period'] = '%s - %s' % (
+            fields.Date.to_string(line['period_start']), fields.Date.to_string(line['period_end']),
+        )
+        line['location_name'] = line['location_name'] or ''
+        line['opening'] = line['opening'] or 0.0
+        line['receipt'] = line['receipt'] or 0.0
+        line['issue'] = line['issue'] or 0.0
+        physical_adjustment = line['physical_adjustment'] or 0.0
+
+        # Total = Opening + Receipt
+        line['total'] = line['opening'] + line['receipt']
+
+        # Closing Stock = Opening + Receipt - Issue (calculated stock)
+        line['closing'] = line['total'] - line['issue']
+
+        # Physical Stock = Closing + Physical Adjustment
+        # - If NO inventory adjustment done: physical_adjustment = 0, so Physical = Closing
+        # - If inventory adjustment done: Physical = Closing + Adjustment (the actual counted stock)
+        line['physical'] = physical_adjustment
+
+        # Difference = Physical - Closing
+        # - If Physical = Closing, then Difference = 0
+        # - If Physical > Closing, then Difference is positive (surplus/gain)
+        # - If Physical < Closing, then Difference is negative (shortage/loss)
+        line['difference'] = line['physical'] - line['closing']
+
+        # Only show difference if it's not zero
+        if abs(line['difference']) < 0.01:  # Avoid floating point issues
+            line['difference'] = 0.0
+        return line
+
+    @api.model
+    def _iter_statement_lines(self, data, fetch_size=2000):
+        """Yield the statement rows through a server-side cursor, ``fetch_size`` rows at a time"""
+        query, params = self._get_statement_query(data)
+        cr = self.env.cr
+        cr.execute("DECLARE vsr_stock_statement_cursor NO SCROLL CURSOR FOR " + query, params)
+        try:
+            while True:
+                cr.execute("FETCH FORWARD %s FROM vsr_stock_statement_cursor", [fetch_size])
+                lines = cr.dictfetchall()
+                if not lines:
+                    break
+                for line in lines:
+                    yield self._compute_statement_line(line)
+        finally:
+            cr.execute("CLOSE vsr_stock_statement_cursor")
@@ -0,0 +1,93 @@
+from odoo import Command
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestWastageLedger(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.warehouse = cls.env['stock.warehouse'].search([('company_id', '=', cls.env.company.id)], limit=1)
+        cls.stock_location = cls.warehouse.lot_stock_id
+        cls.product = cls.env['product.product'].create({
+            'name': 'Wastage Test Product',
+            'is_storable': True,
+        })
+
+    def _create_receipt_and_delivery(self, receipt_qty, delivery_qty):
+        """A receipt whose move feeds the move of a delivery"""
+        receipt = self.env['stock.picking'].create({
+            'picking_type_id': self.warehouse.in_type_id.id,
+            'location_id': self.env.ref('stock.stock_location_suppliers').id,
+            'location_dest_id': self.stock_location.id,
+            'move_ids': [Command.create({
+                'name': self.product.name,
+                'product_id': self.product.id,
+                'product_uom_qty': receipt_qty,
+                'product_uom': self.product.uom_id.id,
+                'location_id': self.env.ref('stock.stock_location_suppliers').id,
+                'location_dest_id': self.stock_location.id,
+            })],
+        })
+        delivery = self.env['stock.picking'].create({
+            'picking_type_id': self.warehouse.out_type_id.id,
+            'location_id': self.stock_location.id,
+            'location_dest_id': self.env.ref('stock.stock_location_customers').id,
+            'move_ids': [Command.create({
+                'name': self.product.name,
+                'product_id': self.product.id,
+                'product_uom_qty': delivery_qty,
+                'product_uom': self.product.uom_id.id,
+                'location_id': self.stock_location.id,
+                'location_dest_id': self.env.ref('stock.stock_location_customers').id,
+            })],
+        })
+        receipt.move_ids.move_dest_ids = delivery.move_ids
+        return receipt, delivery
+
+    def _scrap(self, picking, qty):
+        return self.env['stock.scrap'].create({
+            'product_id': self.product.id,
+            'product_uom_id': self.product.uom_id.id,
+            'scrap_qty': qty,
+            'picking_id': picking.id,
+            'location_id': self.stock_location.id,
+        })
+
+    def test_scrap_edit_unlink_restores_demand(self):
+        receipt, delivery = self._create_receipt_and_delivery(100.0, 100.0)
+
+        scrap = self._scrap(receipt, 10.0)
+        self.assertEqual(receipt.wastage, 10.0)
+        self.assertEqual(delivery.move_ids.product_uom_qty, 90.0)
+
+        scrap.scrap_qty = 30.0
+        self.assertEqual(delivery.move_ids.product_uom_qty, 70.0)
+
+        scrap.scrap_qty = 5.0
+        self.assertEqual(delivery.move_ids.product_uom_qty, 95.0)
+
+        scrap.unlink()
+        self.assertEqual(receipt.wastage, 0.0)
+        self.assertEqual(delivery.move_ids.product_uom_qty, 100.0)
+
+    def test_clamped_deduction_is_not_given_back(self):
+        receipt, delivery = self._create_receipt_and_delivery(100.0, 20.0)
+
+        # Only 20 of the 30 scrapped can be deducted
+        scrap = self._scrap(receipt, 30.0)
+        self.assertEqual(delivery.move_ids.product_uom_qty, 0.0)
+        ledger = self.env['stock.picking.wastage'].search([('picking_id', '=', receipt.id)])
+        self.assertEqual(ledger.applied_qty, 20.0)
+
+        # Still more scrapped than deducted: nothing to give back
+        scrap.scrap_qty = 25.0
+        self.assertEqual(delivery.move_ids.product_uom_qty, 0.0)
+
+        scrap.scrap_qty = 10.0
+        self.assertEqual(delivery.move_ids.product_uom_qty, 10.0)
+
+        scrap.unlink()
+        self.assertEqual(delivery.move_ids.product_uom_qty, 20.0)
+        self.assertFalse(ledger.applied_qty)
@@ -47,49 +47,50 @@ class PlanningSheet(models.TransientModel):
         start_date = datetime.combine(self.date, time.min)
         end_date = datetime.combine(self.date, time.max)
         
-        # Find sale orders with commitment date within the selected date
-        sale_orders = self.env['sale.order'].search([
-            ('state', 'in', ['sale', 'done']),
-            ('commitment_date', '>=', start_date),
-            ('commitment_date', '<=', end_date),
-        ])
-        
-        if not sale_orders:
-             raise UserError(_('No confirmed sales orders found with Delivery Date (Commitment Date) on %s.\n\nPlease check the "Delivery Date" on your Sales Orders.') % self.date)
-
-        # Collect data: {(product, city): qty}
-        planning_data = {}
-        
-        for order in sale_orders:
-            # Get customer city
-            city = order.partner_id.city or order.partner_shipping_id.city
-            if not city:
-                city = 'Unknown'
-            
-            # Process order lines
-            for line in order.order_line:
-                if line.display_type: continue # Skip section/notes
-                if line.product_id.type in ['product', 'consu']:  # Allow Storable and Consumable
-                    key = (line.product_id, city)
-                    if key not in planning_data:
-                        planning_data[key] = 0.0
-                    planning_data[key] += line.product_uom_qty
+        # Sum the ordered quantities per product and customer city in one query
+        # (city of the customer, else of the delivery address)
+        self.env['sale.order'].flush_model(['state', 'commitment_date', 'company_id', 'partner_id', 'partner_shipping_id'])
+        self.env['sale.order.line'].flush_model(['order_id', 'product_id', 'display_type', 'product_uom_qty'])
+        self.env['res.partner'].flush_model(['city'])
+        self.env.cr.execute("""
+            SELECT sol.product_id,
+                   COALESCE(NULLIF(p.city, ''), NULLIF(ps.city, ''), 'Unknown') AS city,
+                   SUM(sol.product_uom_qty)
+              FROM sale_order so
+              JOIN sale_order_line sol ON sol.order_id = so.id
+              JOIN product_product pp ON pp.id = sol.product_id
+              JOIN product_template pt ON pt.id = pp.product_tmpl_id
+         LEFT JOIN res_partner p ON p.id = so.partner_id
+         LEFT JOIN res_partner ps ON ps.id = so.partner_shipping_id
+             WHERE so.state IN ('sale', 'done')
+               AND so.commitment_date >= %s
+               AND so.commitment_date <= %s
+               AND so.company_id = ANY(%s)
+               AND sol.display_type IS NULL
+               AND pt.type IN ('product', 'consu')
+          GROUP BY sol.product_id, 2
+          ORDER BY sol.product_id, 2
+        """, [start_date, end_date, self.env.companies.ids])
+        planning_data = self.env.cr.fetchall()
         
         if not planning_data:
+            sale_orders_count = self.env['sale.order'].search_count([
+                ('state', 'in', ['sale', 'done']),
+                ('commitment_date', '>=', start_date),
+                ('commitment_date', '<=', end_date),
+            ])
+            if not sale_orders_count:
+                raise UserError(_('No confirmed sales orders found with Delivery Date (Commitment Date) on %s.\n\nPlease check the "Delivery Date" on your Sales Orders.') % self.date)
             raise UserError(_('Confirmed sales orders were found for %s, but they do not contain any Storable or Consumable products to plan.') % self.date)
 
-
         # Create planning lines
-        sequence = 10
-        for (product, city), qty in planning_data.items():
-            self.env['planning.sheet.line'].create({
-                'sheet_id': self.id,
-                'product_id': product.id,
-                'city': city,
-                'quantity': qty,
-                'sequence': sequence,
-            })
-            sequence += 10
+        self.env['planning.sheet.line'].create([{
+            'sheet_id': self.id,
+            'product_id': product_id,
+            'city': city,
+            'quantity': qty,
+            'sequence': (index + 1) * 10,
+        } for index, (product_id, city, qty) in enumerate(planning_data)])
 
 
 class PlanningSheetLine(models.TransientModel):
@@ -108,116 +109,14 @@ class PlanningSheetLine(models.TransientModel):
     stocks_in_kgs = fields.Char(string='Stocks in KGS', compute='_compute_stocks_in_kgs', store=True)
     req_qty_in_kgs = fields.Float(string='Req Qty in KGS', compute='_compute_req_qty', store=True)
     
-    @api.depends('product_id')
+    @api.depends('product_id.pack_size_label')
     def _compute_stocks_in_kgs(self):
-        """Extract weight with unit from product name and display it in Stocks in KGS column"""
+        """Display the pack size of the product in Stocks in KGS column"""
         for line in self:
-            if not line.product_id:
-                line.stocks_in_kgs = ''
-                continue
-            
-            # Extract weight with unit from product name
-            line.stocks_in_kgs = self._extract_weight_with_unit(line.product_id.name)
-    
-    def _extract_weight_with_unit(self, name):
-        """
-        Extract weight with unit from product name.
-        Returns: string like '500 G', '1 KG', '2.5 KG', etc.
-        """
-        import re
-        if not name:
-            return ''
-        
-        name_upper = name.upper()
-        
-        # Define weight patterns to extract
-        weight_patterns = [
-            # KG patterns
-            (r'5\s*KG', '5 KG'),
-            (r'2\.5\s*KG', '2.5 KG'),
-            (r'1\s*KG', '1 KG'),
-            # Gram patterns
-            (r'500\s*G', '500 G'),
-            (r'300\s*G', '300 G'),
-            (r'200\s*G', '200 G'),
-            (r'100\s*G', '100 G'),
-            (r'60\s*G', '60 G'),
-            (r'30\s*G', '30 G'),
-            (r'7\s*G', '7 G'),
-        ]
-        
-        # Try to match each pattern
-        for pattern, display_text in weight_patterns:
-            if re.search(pattern, name_upper):
-                return display_text
-        
-        # Fallback: try to extract any KG value
-        kg_match = re.search(r'(\d+\.?\d*)\s*KG', name_upper)
-        if kg_match:
-            return f"{kg_match.group(1)} KG"
-        
-        # Fallback: try to extract any G value
-        g_match = re.search(r'(\d+\.?\d*)\s*G', name_upper)
-        if g_match:
-            return f"{g_match.group(1)} G"
-        
-        return ''
-    
-    
-    
-    @api.depends('quantity', 'product_id')
+            line.stocks_in_kgs = line.product_id.pack_size_label or ''
+
+    @api.depends('quantity', 'product_id.pack_weight_kg', 'product_id.pack_pieces_per_case')
     def _compute_req_qty(self):
         for line in self:
-            if not line.product_id or not line.quantity:
-                line.req_qty_in_kgs = 0.0
-                continue
-            
-            # Extract weight and pieces per case from product name
-            weight_kg, pieces_per_case = self._extract_weight_and_pieces(line.product_id.name)
-            
             # Calculate: Total Qty in Case × Weight in KG × Pieces per Case
-            line.req_qty_in_kgs = line.quantity * weight_kg * pieces_per_case
-    
-    def _extract_weight_and_pieces(self, name):
-        """
-        Extract weight from product name and return corresponding pieces per case.
-        Returns: (weight_in_kg, pieces_per_case)
-        """
-        import re
-        if not name:
-            return 0.0, 0
-        
-        name_upper = name.upper()
-        
-        # Define weight patterns and their corresponding pieces per case
-        weight_mapping = [
-            # KG patterns
-            (r'5\s*KG', 5.0, 4),
-            (r'2\.5\s*KG', 2.5, 6),
-            (r'1\s*KG', 1.0, 12),
-            # Gram patterns
-            (r'500\s*G', 0.5, 24),
-            (r'300\s*G', 0.3, 40),
-            (r'200\s*G', 0.2, 60),
-            (r'100\s*G', 0.1, 90),
-            (r'60\s*G', 0.06, 160),
-            (r'30\s*G', 0.03, 40),
-            (r'7\s*G', 0.007, 1500),
-        ]
-        
-        # Try to match each pattern
-        for pattern, weight_kg, pieces in weight_mapping:
-            if re.search(pattern, name_upper):
-                return weight_kg, pieces
-        
-        # Fallback: try to extract any KG value
-        kg_match = re.search(r'(\d+\.?\d*)\s*KG', name_upper)
-        if kg_match:
-            return float(kg_match.group(1)), 1
-        
-        # Fallback: try to extract any G value
-        g_match = re.search(r'(\d+\.?\d*)\s*G', name_upper)
-        if g_match:
-            return float(g_match.group(1)) / 1000.0, 1
-        
-        return 0.0, 0
+            line.req_qty_in_kgs = line.quantity * line.product_id.pack_weight_kg * line.product_id.pack_pieces_per_case
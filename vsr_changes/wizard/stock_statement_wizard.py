@@ -1,5 +1,6 @@
 from odoo import models, fields, api
-from datetime import date
+from datetime import date, datetime, time
+from dateutil.relativedelta import relativedelta
 
 class StockStatementWizard(models.TransientModel):
     _name = 'vsr.stock.statement.wizard'
@@ -9,12 +10,55 @@ class StockStatementWizard(models.TransientModel):
     date_end = fields.Datetime(string='End Date', required=True, default=fields.Datetime.now)
     company_id = fields.Many2one('res.company', string='Company', required=True, default=lambda self: self.env.company)
     category_ids = fields.Many2many('product.category', string='Categories', default=lambda self: self.env['product.category'].search([]))
+    period_split = fields.Selection([
+        ('none', 'Single Period'),
+        ('month', 'Month by Month'),
+    ], string='Periods', required=True, default='none')
+    breakdown = fields.Selection([
+        ('none', 'Company'),
+        ('warehouse', 'Warehouse'),
+        ('location', 'Location'),
+    ], string='Breakdown', required=True, default='none')
+    warehouse_ids = fields.Many2many('stock.warehouse', string='Warehouses', help='Leave empty to report on all warehouses')
+    export_format = fields.Selection([
+        ('pdf', 'PDF'),
+        ('xlsx', 'Excel (XLSX)'),
+        ('csv', 'CSV'),
+    ], string='Format', required=True, default='pdf')
 
-    def action_print_report(self):
-        data = {
-            'date_start': self.date_start,
-            'date_end': self.date_end,
+    def _get_report_data(self):
+        self.ensure_one()
+        return {
+            'date_start': fields.Datetime.to_string(self.date_start),
+            'date_end': fields.Datetime.to_string(self.date_end),
             'company_id': self.company_id.id,
             'category_ids': self.category_ids.ids,
+            'periods': self._get_periods(),
+            'breakdown': self.breakdown,
+            'warehouse_ids': self.warehouse_ids.ids,
         }
+
+    def _get_periods(self):
+        """Split the date range into the statement periods, as [start, end] strings"""
+        self.ensure_one()
+        if self.period_split != 'month':
+            return [[fields.Datetime.to_string(self.date_start), fields.Datetime.to_string(self.date_end)]]
+        periods = []
+        period_start = self.date_start
+        while period_start <= self.date_end:
+            next_month = datetime.combine(period_start.date().replace(day=1) + relativedelta(months=1), time.min)
+            period_end = min(next_month - relativedelta(seconds=1), self.date_end)
+            periods.append([fields.Datetime.to_string(period_start), fields.Datetime.to_string(period_end)])
+            period_start = next_month
+        return periods
+
+    def action_print_report(self):
+        if self.export_format != 'pdf':
+            # Spreadsheet exports are streamed by the controller
+            return {
+                'type': 'ir.actions.act_url',
+                'url': f'/vsr_changes/stock_statement/{self.id}/{self.export_format}',
+                'target': 'self',
+            }
+        data = self._get_report_data()
         return self.env.ref('vsr_changes.action_report_stock_statement').report_action(self, data=data)
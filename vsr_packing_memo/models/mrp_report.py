@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
-from odoo import fields, models
+from odoo import api, fields, models
+from odoo.tools import SQL
 
 
 class MrpReport(models.Model):
@@ -27,9 +28,10 @@ class MrpReport(models.Model):
                     mo.id AS mo_id,
                     COALESCE(SUM(scrap.scrap_qty), 0.0) AS total_wastage
                 FROM mrp_production AS mo
+                -- The state filter stays in the join so the partial index on done scraps serves it
                 LEFT JOIN stock_scrap AS scrap ON scrap.production_id = mo.id
+                    AND scrap.state = 'done'
                 WHERE mo.state = 'done'
-                    AND (scrap.state = 'done' OR scrap.state IS NULL)
                 GROUP BY mo.id
             ) wastage ON wastage.mo_id = mo.id
         """
@@ -42,3 +44,15 @@ class MrpReport(models.Model):
                 wastage.total_wastage
         """
         return group_by_str
+
+
+class QueryPlan(models.Model):
+    _inherit = 'vsr.query.plan'
+
+    @api.model
+    def _get_diagnostic_queries(self):
+        queries = super()._get_diagnostic_queries()
+        # Production analysis with the wastage subquery
+        query = self.env['mrp.report']._search([])
+        queries.append(('MRP Report - wastage', query.select(SQL.identifier(query.table, 'total_wastage'))))
+        return queries
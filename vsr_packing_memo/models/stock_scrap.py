@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 from odoo import fields, models
+from odoo.tools.sql import create_index
 
 
 class StockScrap(models.Model):
@@ -12,3 +13,11 @@ class StockScrap(models.Model):
     
     lot_no = fields.Char(string='Lot Number')
     production_type = fields.Selection(related='production_id.production_type', string='Production Type')
+
+    def init(self):
+        super().init()
+        # Wastage per manufacturing order in the production analysis
+        create_index(
+            self.env.cr, 'stock_scrap_done_production_id_index', self._table,
+            ['production_id'], where="state = 'done'",
+        )